@@ -1,3 +1,4 @@
+import functools
 import json
 import yaml
 import os
@@ -37,6 +38,9 @@ from activity_utils import (
     create_template_context,
 )
 
+# libyaml's C parser when PyYAML was built with it; same safe schema
+_SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 def handle_get_activity_status(data):
     """Get the current activity status for a room."""
@@ -99,7 +103,7 @@ def get_activity_content(file_path):
         response = s3_client.get_object(Bucket=bucket_name, Key=file_path)
         activity_yaml = response["Body"].read().decode("utf-8")
 
-    return yaml.safe_load(activity_yaml)
+    return yaml.load(activity_yaml, Loader=_SafeLoader)
 
 
 def loop_through_steps_until_question(
@@ -371,6 +375,12 @@ def display_activity_metadata(room_name, username):
         )
 
 
+@functools.lru_cache(maxsize=256)
+def _compile_script(script):
+    """Compile a processing script once; activity scripts run every turn"""
+    return compile(script, "<processing_script>", "exec")
+
+
 def execute_processing_script(metadata, script):
     # Prepare the environment for the script
     # Use the same dict for both globals and locals to support comprehensions
@@ -381,7 +391,7 @@ def execute_processing_script(metadata, script):
     }
 
     # Execute the script
-    exec(script, script_env, script_env)
+    exec(_compile_script(script), script_env, script_env)
 
     # Return the result from the script
     return script_env["script_result"]
@@ -456,14 +466,23 @@ def handle_activity_response(room_name, user_response, username, model="MODEL_0"
                             )
                             socketio.sleep(0.05)
 
-                # Categorize the user's response
-                category = categorize_response(
-                    step["question"],
-                    user_response,
-                    step["buckets"],
-                    step.get("tokens_for_ai", ""),
-                    classifier_model,
-                )
+                # Steps that opt in accept a verbatim bucket label (e.g. a menu
+                # choice) without asking the classifier
+                response_label = user_response.strip().lower().replace(" ", "_")
+                if step.get("match_bucket_labels") and response_label in {
+                    str(bucket).strip().lower().replace(" ", "_")
+                    for bucket in step["buckets"]
+                }:
+                    category = response_label
+                else:
+                    # Categorize the user's response
+                    category = categorize_response(
+                        step["question"],
+                        user_response,
+                        step["buckets"],
+                        step.get("tokens_for_ai", ""),
+                        classifier_model,
+                    )
 
                 # Emit the category to the frontend
                 socketio.emit(
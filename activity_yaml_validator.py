@@ -15,6 +15,9 @@ import argparse
 from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
 
+# libyaml's C parser when PyYAML was built with it; same safe schema
+_SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 class ValidationError(Exception):
     """Custom exception for validation errors"""
@@ -104,7 +107,7 @@ class ActivityYAMLValidator:
 
             # Parse YAML
             try:
-                data = yaml.safe_load(content)
+                data = yaml.load(content, Loader=_SafeLoader)
             except yaml.YAMLError as e:
                 self.errors.append(f"YAML syntax error: {e}")
                 return False, self.errors, self.warnings
@@ -260,6 +263,16 @@ class ActivityYAMLValidator:
                     f"Section {section_id}, step {step_id}: feedback_model must be a string"
                 )
 
+        if "match_bucket_labels" in step:
+            if not isinstance(step["match_bucket_labels"], bool):
+                self.errors.append(
+                    f"Section {section_id}, step {step_id}: match_bucket_labels must be boolean"
+                )
+            elif "question" not in step:
+                self.warnings.append(
+                    f"Section {section_id}, step {step_id}: match_bucket_labels has no effect without a question"
+                )
+
         # Validate content_blocks or question
         has_content = "content_blocks" in step
         has_question = "question" in step
@@ -1,10 +1,26 @@
-import argparse
-import yaml
+import atexit
+import functools
+import hashlib
 import json
 import random
+import re
 import os
+import ssl
 import sys
-from openai import OpenAI
+import threading
+import time
+import httpx
+from collections import ChainMap
+from concurrent.futures import ThreadPoolExecutor
+from openai import (
+    OpenAI,
+    APIConnectionError,
+    APITimeoutError,
+    BadRequestError,
+    DefaultHttpxClient,
+    InternalServerError,
+    RateLimitError,
+)
 
 # Add parent directory to path to import activity_utils
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -23,16 +39,143 @@ from activity_utils import (
 # Global model-client mapping
 MODEL_CLIENT_MAP = {}
 
+# Dump the full metadata dict after each transition; off by default since the
+# JSON serialization runs on every attempt. Set GUARDED_AI_DEBUG=1 to enable
+DEBUG = os.getenv("GUARDED_AI_DEBUG", "0") == "1"
+
+# Categories that keep the learner on the current step for another attempt
+_RETRY_CATEGORIES = frozenset(
+    {
+        "partial_understanding",
+        "limited_effort",
+        "asking_clarifying_questions",
+        "set_language",
+        "off_topic",
+    }
+)
+
+# Bucket labels that map onto boolean transition keys
+_TRUE_STRS = frozenset({"yes", "true"})
+_FALSE_STRS = frozenset({"no", "false"})
+
+# Sentinel for a category with no matching transition key
+_NO_TRANSITION = object()
+
+# (model, endpoint) pairs that rejected or ignored JSON-mode batched feedback
+_BATCH_FEEDBACK_UNSUPPORTED = set()
+
+# Upper bound on LLM requests issued concurrently for a single turn
+MAX_CONCURRENT_LLM_CALLS = 10
+
+# Caps in-flight API requests across all threads (feedback fan-out,
+# translation precompute) so concurrency doesn't trip endpoint rate limits
+_LLM_CALL_SLOTS = threading.BoundedSemaphore(MAX_CONCURRENT_LLM_CALLS)
+
+# Transient API errors (429, 5xx, network) worth retrying before giving up on a turn
+RETRYABLE_ERRORS = (
+    RateLimitError,
+    InternalServerError,
+    APIConnectionError,
+    APITimeoutError,
+)
+
+
+def _call_with_retry(fn, *args, retries=3, base=0.5, **kwargs):
+    """Call fn, retrying transient API errors with exponential backoff and jitter
+
+    At most MAX_CONCURRENT_LLM_CALLS calls run at once; the slot is released
+    while backing off.
+    """
+    for attempt in range(retries):
+        try:
+            with _LLM_CALL_SLOTS:
+                return fn(*args, **kwargs)
+        except RETRYABLE_ERRORS:
+            if attempt == retries - 1:
+                raise
+            time.sleep(base * 2**attempt + random.random() * 0.1)
+
+
+def _stream_with_retry(fn, *args, retries=3, base=0.5, **kwargs):
+    """Open a streamed completion like _call_with_retry and yield its chunks
+
+    The slot is held until the stream is exhausted or closed, since the
+    response keeps its connection busy while it's being read.
+    """
+    for attempt in range(retries):
+        _LLM_CALL_SLOTS.acquire()
+        try:
+            stream = fn(*args, **kwargs)
+        except RETRYABLE_ERRORS:
+            _LLM_CALL_SLOTS.release()
+            if attempt == retries - 1:
+                raise
+            time.sleep(base * 2**attempt + random.random() * 0.1)
+            continue
+        except BaseException:
+            _LLM_CALL_SLOTS.release()
+            raise
+        try:
+            yield from stream
+        finally:
+            _LLM_CALL_SLOTS.release()
+        return
+
+
+# OpenAI clients keyed by (endpoint, api_key); construction is expensive
+# (SSL context setup) so each endpoint gets exactly one client per process
+_CLIENT_CACHE = {}
+
+# Loading the CA bundle dominates client construction, so build it once and
+# share it; each client still gets its own connection pool
+_SHARED_SSL_CTX = ssl.create_default_context()
+_HTTP_LIMITS = httpx.Limits(
+    max_keepalive_connections=32, max_connections=64, keepalive_expiry=60
+)
+
+
+def close_clients():
+    """Close every cached client and its pooled keep-alive connections"""
+    for client in _CLIENT_CACHE.values():
+        client.close()
+    _CLIENT_CACHE.clear()
+
+
+atexit.register(close_clients)
+
 
 def get_client_for_endpoint(endpoint, api_key):
-    """Create OpenAI client for any endpoint"""
-    return OpenAI(api_key=api_key, base_url=endpoint)
+    """Get the cached OpenAI client for an endpoint, creating it on first use"""
+    key = (endpoint, api_key)
+    client = _CLIENT_CACHE.get(key)
+    if client is None:
+        http_client = DefaultHttpxClient(verify=_SHARED_SSL_CTX, limits=_HTTP_LIMITS)
+        client = _CLIENT_CACHE[key] = OpenAI(
+            api_key=api_key, base_url=endpoint, http_client=http_client
+        )
+    return client
+
+
+_ENDPOINT_KEY_RE = re.compile(r"^MODEL_ENDPOINT_(\d+)$")
+
+
+# Set once the model map has been built; guarded so concurrent first calls
+# from the feedback thread pool only query the endpoints once
+_model_map_initialized = False
+_MODEL_MAP_LOCK = threading.Lock()
 
 
 def initialize_model_map():
     """Initialize the model-client mapping from environment variables"""
-    # Load endpoints from environment variables
-    for i in range(1000):  # Support up to 1000 endpoints
+    # Load endpoints from environment variables, visiting only configured ids
+    endpoint_ids = sorted(
+        {
+            int(match.group(1))
+            for match in map(_ENDPOINT_KEY_RE.match, os.environ)
+            if match
+        }
+    )
+    for i in endpoint_ids:
         endpoint_key = f"MODEL_ENDPOINT_{i}"
         api_key_key = f"MODEL_API_KEY_{i}"
 
@@ -67,6 +210,17 @@ def get_openai_client_and_model(model_name=None):
     Supports both direct model names and MODEL_X environment variable references.
     If model_name is MODEL_1, MODEL_2, etc., looks up from environment.
     """
+    global _model_map_initialized
+
+    # Build the model map on first use rather than at import time
+    if not _model_map_initialized:
+        with _MODEL_MAP_LOCK:
+            if not _model_map_initialized:
+                initialize_model_map()
+                # Set only once the map is complete; callers that skip the
+                # lock on this flag must never see a half-built map
+                _model_map_initialized = True
+
     # Handle MODEL_X references
     if model_name and model_name.startswith("MODEL_"):
         # Extract the number from MODEL_X
@@ -133,54 +287,332 @@ def get_openai_client_and_model(model_name=None):
     return client, model_name
 
 
-# Initialize the model mapping on startup
-initialize_model_map()
+# Load the YAML activity file
+def load_yaml_activity(source):
+    """Load an activity from a file path or an already-open text stream"""
+    if hasattr(source, "read"):
+        return parse_yaml_activity(source)
+    with open(source, "r") as file:
+        return parse_yaml_activity(file)
+
+
+def parse_yaml_activity(stream):
+    """Parse an activity from YAML text or an open text stream"""
+    import yaml
+
+    # libyaml's C parser when PyYAML was built with it; same safe schema
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    return prepare_activity(yaml.load(stream, Loader=loader))
+
+
+def _iter_steps(activity_content):
+    """Yield every well-formed step dict, skipping malformed sections/steps"""
+    sections = activity_content.get("sections")
+    if not isinstance(sections, list):
+        return
+    for section in sections:
+        if not isinstance(section, dict) or not isinstance(section.get("steps"), list):
+            continue
+        for step in section["steps"]:
+            if isinstance(step, dict):
+                yield step
 
 
-# Load the YAML activity file
-def load_yaml_activity(file_path):
-    with open(file_path, "r") as file:
-        return yaml.safe_load(file)
+def _normalize_bucket_keys(transitions):
+    """Map each transition key's lowercase label back to the key itself
+
+    YAML turns buckets like 1912 or true into int/bool keys while the
+    classifier answers with strings, so matching a category is one lookup
+    here. yes/no alias the boolean keys; the first key wins a clash.
+    True == 1 and False == 0 as dict keys, so 1/0 and true/false also
+    alias each other across bool and int keys, as they always have.
+    """
+    normalized = {}
+    for key in transitions:
+        normalized.setdefault(str(key).lower(), key)
+        if isinstance(key, int) and key in (0, 1):
+            truthy = key == 1
+            for alias in _TRUE_STRS if truthy else _FALSE_STRS:
+                normalized.setdefault(alias, key)
+            normalized.setdefault("1" if truthy else "0", key)
+    return normalized
+
+
+def _transition_key(transitions, transitions_norm, bucket):
+    """Return the transitions key a bucket selects, or _NO_TRANSITION
+
+    An exact key wins; otherwise the bucket's lowercase label is looked up
+    in transitions_norm, with digit labels like "01912" also tried as the
+    integer bucket they name.
+    """
+    if isinstance(bucket, str) and bucket in transitions:
+        return bucket
+    label = str(bucket).lower()
+    key = transitions_norm.get(label, _NO_TRANSITION)
+    if key is _NO_TRANSITION and label.isdigit():
+        key = transitions_norm.get(str(int(label)), _NO_TRANSITION)
+    return key
+
+
+def prepare_activity(activity_content):
+    """Precompute per-step values that are reused on every user turn"""
+    if not isinstance(activity_content, dict):
+        return activity_content
+
+    for step in _iter_steps(activity_content):
+        if isinstance(step.get("buckets"), list):
+            step["_bucket_list_str"] = ", ".join(
+                str(bucket) for bucket in step["buckets"]
+            )
+            # Labels as categorize_response normalizes them
+            step["_bucket_set"] = frozenset(
+                str(bucket).strip().lower().replace(" ", "_")
+                for bucket in step["buckets"]
+            )
+
+        transitions = step.get("transitions")
+        if not isinstance(transitions, dict):
+            continue
+        step["_transitions_norm"] = _normalize_bucket_keys(transitions)
+        for transition in transitions.values():
+            if not isinstance(transition, dict):
+                continue
+            for section_key, ops_key in _METADATA_OPS_KEYS:
+                if isinstance(transition.get(section_key), dict):
+                    transition[ops_key] = _compile_metadata_ops(
+                        transition[section_key],
+                        is_tmp=section_key == "metadata_tmp_add",
+                    )
+            if isinstance(transition.get("metadata_feedback_filter"), list):
+                transition["_feedback_filter"] = frozenset(
+                    transition["metadata_feedback_filter"]
+                )
+
+    return index_activity(activity_content)
+
+
+# Transition metadata sections and where their compiled operations are stored
+_METADATA_OPS_KEYS = (
+    ("metadata_add", "_ops_add"),
+    ("metadata_tmp_add", "_ops_tmp_add"),
+)
+
+
+# Categorization results keyed by a hash of everything sent to the classifier
+CATEGORY_CACHE_SIZE = 4096
+_CATEGORY_CACHE = {}
+
+# Translations keyed by (target language, model, source text)
+TRANSLATION_CACHE_SIZE = 4096
+_TRANSLATION_CACHE = {}
+
+
+# Serializes eviction and insert; translations are cached from worker threads
+_CACHE_LOCK = threading.Lock()
+
+
+def _cache_put(cache, key, value, max_size):
+    """Store value in a bounded cache, evicting the oldest entry when full"""
+    with _CACHE_LOCK:
+        if len(cache) >= max_size:
+            # Dicts preserve insertion order, so the first key is the oldest
+            del cache[next(iter(cache))]
+        cache[key] = value
+
+
+@functools.lru_cache(maxsize=256)
+def _bucket_first_tokens(model_name, bucket_labels):
+    """Map bucket first-token ids to (token text, label) for one-token labels
+
+    Only possible when tiktoken knows the model's encoding (OpenAI models);
+    self-hosted models use other tokenizers, so they return None, as do
+    bucket sets with fewer than two labels or a shared first token.
+    """
+    if len(bucket_labels) < 2:
+        return None
+    # Imported on first classification so plain imports of this module skip it
+    import tiktoken
+
+    try:
+        encoding = tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        # Unknown model; other errors (a failed BPE download) propagate so
+        # the lru_cache doesn't remember them and the next call retries
+        return None
+    token_labels = {}
+    for label in bucket_labels:
+        tokens = encoding.encode(label)
+        if not tokens or tokens[0] in token_labels:
+            return None
+        token_labels[tokens[0]] = (encoding.decode([tokens[0]]), label)
+    return token_labels
 
 
 # Categorize the user's response
-def categorize_response(question, response, buckets, tokens_for_ai, model="MODEL_1"):
-    bucket_list = ", ".join([str(bucket) for bucket in buckets])
+def build_classifier_system_prompt(question, buckets, tokens_for_ai, bucket_list=None):
+    """Build the classifier system message shared by every attempt at a step
+
+    Everything except the user's response lives here, so the message is
+    byte-identical across retries and endpoints can reuse the cached prefix.
+    """
+    # bucket_list is the precomputed "_bucket_list_str" when called per step
+    if bucket_list is None:
+        bucket_list = ", ".join([str(bucket) for bucket in buckets])
+    return f"{tokens_for_ai} Categorize the following response into one of the following buckets: {bucket_list}. Return ONLY a bucket label.\n\nQuestion: {question}"
+
+
+def categorize_response(
+    question,
+    response,
+    buckets,
+    tokens_for_ai,
+    model="MODEL_1",
+    bucket_list=None,
+    prebuilt_system=None,
+):
+    system_prompt = prebuilt_system or build_classifier_system_prompt(
+        question, buckets, tokens_for_ai, bucket_list
+    )
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"Response: {response}\n\nCategory:"},
+    ]
+
+    # temperature=0 makes the label deterministic, so identical inputs reuse it
+    cache_key = hashlib.blake2b(
+        f"{model}|{system_prompt}|{response}".encode(), digest_size=16
+    ).hexdigest()
+    # A single get, so an eviction between check and read can't raise
+    cached = _CATEGORY_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        client, model_name = get_openai_client_and_model(model)
+        try:
+            token_labels = _bucket_first_tokens(
+                model_name, tuple(str(bucket) for bucket in buckets)
+            )
+        except Exception:
+            # Tokenizer unavailable this time; classify with free text
+            token_labels = None
+        if token_labels:
+            # Force a single token drawn from the buckets' first tokens
+            completion = _call_with_retry(
+                client.chat.completions.create,
+                model=model_name,
+                messages=messages,
+                max_tokens=1,
+                temperature=0,
+                logit_bias={token_id: 100 for token_id in token_labels},
+            )
+            content = completion.choices[0].message.content
+            label = next(
+                (
+                    label
+                    for token_id, (token, label) in token_labels.items()
+                    if token == content
+                ),
+                content,
+            )
+        else:
+            completion = _call_with_retry(
+                client.chat.completions.create,
+                model=model_name,
+                messages=messages,
+                max_tokens=5,
+                temperature=0,
+            )
+            label = completion.choices[0].message.content
+        category = label.strip().lower().replace(" ", "_")
+    except Exception as e:
+        return f"Error: {e}"
+
+    _cache_put(_CATEGORY_CACHE, cache_key, category, CATEGORY_CACHE_SIZE)
+    return category
+
+
+# Generate AI feedback
+def generate_ai_feedback(
+    category,
+    question,
+    user_response,
+    tokens_for_ai,
+    metadata,
+    model="MODEL_1",
+    on_delta=None,
+):
+    """Generate a feedback message, streaming it to on_delta if given
+
+    The full feedback text is returned either way.
+    """
     messages = [
         {
             "role": "system",
-            "content": f"{tokens_for_ai} Categorize the following response into one of the following buckets: {bucket_list}. Return ONLY a bucket label.",
+            "content": f"{tokens_for_ai} Generate a human-readable feedback message based on the following:",
         },
         {
             "role": "user",
-            "content": f"Question: {question}\nResponse: {response}\n\nCategory:",
+            "content": f"Question: {question}\nResponse: {user_response}\nCategory: {category},\nMetadata: {metadata}",
         },
     ]
 
     try:
         client, model_name = get_openai_client_and_model(model)
-        completion = client.chat.completions.create(
+        if on_delta is None:
+            completion = _call_with_retry(
+                client.chat.completions.create,
+                model=model_name,
+                messages=messages,
+                max_tokens=250,
+                temperature=0.7,
+            )
+            return completion.choices[0].message.content.strip()
+
+        stream = _stream_with_retry(
+            client.chat.completions.create,
             model=model_name,
             messages=messages,
-            max_tokens=5,
-            temperature=0,
+            max_tokens=250,
+            temperature=0.7,
+            stream=True,
         )
-        category = (
-            completion.choices[0].message.content.strip().lower().replace(" ", "_")
-        )
-        return category
+        pieces = []
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                pieces.append(delta)
+                on_delta(delta)
+        return "".join(pieces).strip()
     except Exception as e:
         return f"Error: {e}"
 
 
-# Generate AI feedback
-def generate_ai_feedback(
-    category, question, user_response, tokens_for_ai, metadata, model="MODEL_1"
+# Generate feedback for several prompts with a single completion
+def generate_batched_ai_feedback(
+    category,
+    question,
+    user_response,
+    prompt_tokens,
+    tokens_for_ai,
+    metadata,
+    model="MODEL_1",
 ):
+    """Generate feedback for several prompts in one JSON-mode completion
+
+    prompt_tokens maps prompt name -> that prompt's tokens_for_ai. Returns a
+    dict of prompt name -> feedback, or None if the reply was unusable so
+    the caller can fall back to one completion per prompt.
+    """
+    prompt_list = "\n".join(
+        f"- {name}: {tokens}" for name, tokens in prompt_tokens.items()
+    )
     messages = [
         {
             "role": "system",
-            "content": f"{tokens_for_ai} Generate a human-readable feedback message based on the following:",
+            "content": f"{tokens_for_ai} Generate a human-readable feedback message for each of the following feedback prompts:\n{prompt_list}\n\nReturn ONLY a JSON object mapping each prompt name to its feedback message.",
         },
         {
             "role": "user",
@@ -190,13 +622,54 @@ def generate_ai_feedback(
 
     try:
         client, model_name = get_openai_client_and_model(model)
-        completion = client.chat.completions.create(
-            model=model_name, messages=messages, max_tokens=250, temperature=0.7
+    except Exception as e:
+        print(f"Warning: Batched feedback failed, using one request per prompt: {e}")
+        return None
+    endpoint_key = (model_name, str(getattr(client, "base_url", None)))
+    if endpoint_key in _BATCH_FEEDBACK_UNSUPPORTED:
+        return None
+
+    try:
+        completion = _call_with_retry(
+            client.chat.completions.create,
+            model=model_name,
+            messages=messages,
+            max_tokens=250 * len(prompt_tokens),
+            temperature=0.7,
+            response_format={"type": "json_object"},
+        )
+        feedback = json.loads(completion.choices[0].message.content)
+    except BadRequestError as e:
+        message = str(e).lower()
+        if "response_format" in message or "json_object" in message:
+            # JSON mode rejected; it won't work on later turns either
+            _BATCH_FEEDBACK_UNSUPPORTED.add(endpoint_key)
+            print(
+                f"Warning: Batched feedback unsupported by {model_name}, "
+                f"using one request per prompt from now on: {e}"
+            )
+        else:
+            print(
+                f"Warning: Batched feedback failed, using one request per prompt: {e}"
+            )
+        return None
+    except ValueError:
+        # One truncated or malformed reply; later turns may well parse
+        print(
+            "Warning: Batched feedback was not valid JSON, using one request per prompt"
         )
-        feedback = completion.choices[0].message.content.strip()
-        return feedback
+        return None
     except Exception as e:
-        return f"Error: {e}"
+        print(f"Warning: Batched feedback failed, using one request per prompt: {e}")
+        return None
+
+    if not isinstance(feedback, dict) or not all(
+        isinstance(feedback.get(name), str) for name in prompt_tokens
+    ):
+        print("Warning: Batched feedback was incomplete, using one request per prompt")
+        return None
+
+    return {name: feedback[name] for name in prompt_tokens}
 
 
 # Provide feedback based on the category (legacy single feedback system)
@@ -209,6 +682,7 @@ def provide_feedback(
     tokens_for_ai,
     metadata,
     model="MODEL_1",
+    on_delta=None,
 ):
     feedback = ""
     if "ai_feedback" in transition:
@@ -217,11 +691,19 @@ def provide_feedback(
         # Filter metadata for feedback if metadata_feedback_filter is specified
         feedback_metadata = metadata
         if "metadata_feedback_filter" in transition:
-            filter_keys = transition["metadata_feedback_filter"]
+            filter_keys = transition.get("_feedback_filter") or frozenset(
+                transition["metadata_feedback_filter"]
+            )
             feedback_metadata = {k: v for k, v in metadata.items() if k in filter_keys}
 
         ai_feedback = generate_ai_feedback(
-            category, question, user_response, tokens_for_ai, feedback_metadata, model
+            category,
+            question,
+            user_response,
+            tokens_for_ai,
+            feedback_metadata,
+            model,
+            on_delta=on_delta,
         )
         feedback += f"\n\nAI Feedback: {ai_feedback}"
 
@@ -240,24 +722,42 @@ def provide_feedback_prompts(
     legacy_tokens_for_ai="",
     model="MODEL_1",
 ):
-    """Generate feedback from multiple prompts"""
+    """Generate feedback from multiple prompts
+
+    Prompts that all see the same response and metadata are answered by a
+    single batched completion. Otherwise (or if the batched reply is
+    unusable) each prompt gets its own completion; these run concurrently
+    and results keep the order of feedback_prompts.
+    """
     feedback_messages = []
+    feedback_requests = []
+
+    # Instructions shared by every prompt, used when batching
+    shared_tokens_for_ai = (
+        f"{legacy_tokens_for_ai} Provide the feedback in {user_language}."
+    )
+    if "ai_feedback" in transition:
+        shared_tokens_for_ai += f" {transition['ai_feedback'].get('tokens_for_ai', '')}"
 
-    # Add user_response to metadata for filtering purposes
-    full_metadata = metadata.copy()
-    full_metadata["user_response"] = user_response
+    # Overlay user_response on metadata for filtering purposes without copying
+    # it; the unfiltered view is only materialized if some prompt needs it
+    full_metadata = ChainMap({"user_response": user_response}, metadata)
+    unfiltered_metadata = None
 
     for prompt in feedback_prompts:
         prompt_name = prompt.get("name", "unnamed")
         tokens_for_ai = prompt.get("tokens_for_ai", "")
 
         # Apply per-prompt metadata filtering if specified
-        prompt_metadata = full_metadata
         if "metadata_filter" in prompt:
             filter_keys = prompt["metadata_filter"]
             prompt_metadata = {
                 k: v for k, v in full_metadata.items() if k in filter_keys
             }
+        else:
+            if unfiltered_metadata is None:
+                unfiltered_metadata = dict(full_metadata)
+            prompt_metadata = unfiltered_metadata
 
         # Combine legacy tokens with prompt-specific tokens
         if legacy_tokens_for_ai:
@@ -278,15 +778,59 @@ def provide_feedback_prompts(
         ):
             filtered_user_response = ""  # Remove user response if not in filter
 
-        ai_feedback = generate_ai_feedback(
+        feedback_requests.append(
+            (
+                prompt_name,
+                prompt.get("tokens_for_ai", ""),
+                (
+                    category,
+                    question,
+                    filtered_user_response,
+                    tokens_for_ai,
+                    prompt_metadata,
+                    model,
+                ),
+            )
+        )
+
+    if not feedback_requests:
+        return feedback_messages
+
+    ai_feedbacks = None
+    prompt_names = [prompt_name for prompt_name, _, _ in feedback_requests]
+    first_args = feedback_requests[0][2]
+    if (
+        len(feedback_requests) > 1
+        and len(set(prompt_names)) == len(prompt_names)
+        and all(
+            args[2] == first_args[2] and args[4] == first_args[4]
+            for _, _, args in feedback_requests
+        )
+    ):
+        batched_feedback = generate_batched_ai_feedback(
             category,
             question,
-            filtered_user_response,
-            tokens_for_ai,
-            prompt_metadata,
+            first_args[2],
+            {prompt_name: tokens for prompt_name, tokens, _ in feedback_requests},
+            shared_tokens_for_ai,
+            first_args[4],
             model,
         )
+        if batched_feedback is not None:
+            ai_feedbacks = [batched_feedback[name] for name in prompt_names]
+
+    if ai_feedbacks is None:
+        with ThreadPoolExecutor(
+            max_workers=min(len(feedback_requests), MAX_CONCURRENT_LLM_CALLS)
+        ) as executor:
+            ai_feedbacks = list(
+                executor.map(
+                    lambda request: generate_ai_feedback(*request[2]),
+                    feedback_requests,
+                )
+            )
 
+    for prompt_name, ai_feedback in zip(prompt_names, ai_feedbacks):
         # Only add feedback if it has content and isn't exactly the STFU token
         if ai_feedback and ai_feedback.strip() and ai_feedback.strip() != "STFU":
             feedback_messages.append(
@@ -296,6 +840,86 @@ def provide_feedback_prompts(
     return feedback_messages
 
 
+def _compile_metadata_value(value, key, is_tmp=False):
+    """Compile a metadata_add / metadata_tmp_add value into an operation
+
+    Returns fn(metadata, user_response) -> new value for key. Supports
+    "the-users-response", "n+random(x,y)", "n+,suffix" / "n-,suffix" string
+    concatenation and "n+5" / "n-5" numeric operations; anything else is a
+    literal. For temporary metadata, "n+random(x,y)" yields a fresh roll
+    rather than an increment.
+    """
+    if value == "the-users-response":
+        return lambda metadata, user_response: user_response
+    if not isinstance(value, str) or not (
+        value.startswith("n+") or value.startswith("n-")
+    ):
+        return lambda metadata, user_response: value
+
+    if value.startswith("n+random(") and value.endswith(")"):
+        # Extract the range and apply the random increment
+        range_values = value[9:-1].split(",")
+        try:
+            x, y = map(int, range_values)
+        except ValueError:
+            print(f"Warning: Invalid random range '{value}' for key '{key}'")
+            return lambda metadata, user_response: value
+        if is_tmp:
+            return lambda metadata, user_response: random.randint(x, y)
+        return lambda metadata, user_response: metadata.get(key, 0) + random.randint(
+            x, y
+        )
+
+    operation = value[:2]  # "n+" or "n-"
+    if value.startswith("n+,") or value.startswith("n-,"):
+        # String concatenation: append/remove from existing value
+        suffix = value[3:]  # Everything after "n+," or "n-,"
+
+        if operation == "n+":
+
+            def append(metadata, user_response):
+                # Append with comma separator if existing value is non-empty
+                existing_value = metadata.get(key, "")
+                return f"{existing_value},{suffix}" if existing_value else suffix
+
+            return append
+
+        def remove(metadata, user_response):
+            # Remove suffix from existing value
+            existing_value = metadata.get(key, "")
+            if existing_value:
+                parts = [p for p in existing_value.split(",") if p != suffix]
+                return ",".join(parts)
+            return existing_value
+
+        return remove
+
+    # Numeric operation: extract the numeric part c and apply the operation +/-
+    try:
+        c = int(value[2:])
+    except ValueError:
+        print(f"Warning: Invalid numeric operation '{value}' for key '{key}'")
+        # Leave value as-is if parsing fails
+        return lambda metadata, user_response: value
+    if operation == "n-":
+        c = -c
+    return lambda metadata, user_response: metadata.get(key, 0) + c
+
+
+def _compile_metadata_ops(mapping, is_tmp=False):
+    """Compile a metadata_add / metadata_tmp_add mapping into (key, fn) pairs"""
+    return [
+        (key, _compile_metadata_value(value, key, is_tmp))
+        for key, value in mapping.items()
+    ]
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_script(script):
+    """Compile a processing script once; activity scripts run every turn"""
+    return compile(script, "<processing_script>", "exec")
+
+
 def execute_processing_script(metadata, script):
     # Prepare the environment for the script
     # Use the same dict for both globals and locals to support comprehensions
@@ -306,33 +930,60 @@ def execute_processing_script(metadata, script):
     }
 
     # Execute the script
-    exec(script, script_env, script_env)
+    exec(_compile_script(script), script_env, script_env)
 
     # Return the result from the script
     return script_env["script_result"]
 
 
+def index_activity(activity_content):
+    """Index steps by (section_id, step_id) together with each step's successor
+
+    The index is stored on the activity dict itself so navigation is a dict
+    lookup instead of a scan over every section and step.
+    """
+    steps_by_id = {}
+    next_step_by_id = {}
+    # (section_id, well-formed steps) for every section that has a step list
+    sections = [
+        (
+            section.get("section_id"),
+            [s for s in section["steps"] if isinstance(s, dict)],
+        )
+        for section in activity_content.get("sections") or []
+        if isinstance(section, dict) and isinstance(section.get("steps"), list)
+    ]
+    for section_index, (section_id, steps) in enumerate(sections):
+        for i, step in enumerate(steps):
+            key = (section_id, step.get("step_id"))
+            if key in steps_by_id:
+                continue
+            steps_by_id[key] = step
+            if i + 1 < len(steps):
+                next_step_by_id[key] = (section_id, steps[i + 1].get("step_id"))
+            elif section_index + 1 < len(sections) and sections[section_index + 1][1]:
+                # Move to the next section
+                next_section_id, next_steps = sections[section_index + 1]
+                next_step_by_id[key] = (next_section_id, next_steps[0].get("step_id"))
+
+    activity_content["_steps_by_id"] = steps_by_id
+    activity_content["_next_step_by_id"] = next_step_by_id
+    return activity_content
+
+
+def get_step(activity_content, section_id, step_id):
+    """Look up a step by its section and step ids (None if it doesn't exist)"""
+    if "_steps_by_id" not in activity_content:
+        index_activity(activity_content)
+    return activity_content["_steps_by_id"].get((section_id, step_id))
+
+
 def get_next_section_and_step(activity_content, current_section_id, current_step_id):
-    for section in activity_content["sections"]:
-        if section["section_id"] == current_section_id:
-            for i, step in enumerate(section["steps"]):
-                if step["step_id"] == current_step_id:
-                    if i + 1 < len(section["steps"]):
-                        return section["section_id"], section["steps"][i + 1]["step_id"]
-                    else:
-                        # Move to the next section
-                        next_section_index = (
-                            activity_content["sections"].index(section) + 1
-                        )
-                        if next_section_index < len(activity_content["sections"]):
-                            next_section = activity_content["sections"][
-                                next_section_index
-                            ]
-                            return (
-                                next_section["section_id"],
-                                next_section["steps"][0]["step_id"],
-                            )
-    return None, None
+    if "_next_step_by_id" not in activity_content:
+        index_activity(activity_content)
+    return activity_content["_next_step_by_id"].get(
+        (current_section_id, current_step_id), (None, None)
+    )
 
 
 def translate_text(text, target_language, model="MODEL_1"):
@@ -340,6 +991,11 @@ def translate_text(text, target_language, model="MODEL_1"):
     if target_language.lower() == "english":
         return text
 
+    cache_key = (target_language.lower(), model, text)
+    cached = _TRANSLATION_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
     messages = [
         {
             "role": "system",
@@ -353,17 +1009,166 @@ def translate_text(text, target_language, model="MODEL_1"):
 
     try:
         client, model_name = get_openai_client_and_model(model)
-        completion = client.chat.completions.create(
-            model=model_name, messages=messages, max_tokens=500, temperature=0.7
+        completion = _call_with_retry(
+            client.chat.completions.create,
+            model=model_name,
+            messages=messages,
+            max_tokens=500,
+            temperature=0.7,
         )
         translation = completion.choices[0].message.content.strip()
-        return translation
     except Exception as e:
         return f"Error: {e}"
 
+    _cache_put(_TRANSLATION_CACHE, cache_key, translation, TRANSLATION_CACHE_SIZE)
+    return translation
 
-def simulate_activity(yaml_file_path):
+
+def translation_cache_path(yaml_file_path, target_language):
+    """Path of the on-disk translation file that sits next to an activity"""
+    return f"{yaml_file_path}.{target_language.lower()}.trans.json"
+
+
+def _translate_blocks(blocks, target_language, model="MODEL_1"):
+    """Translate content blocks one at a time and rejoin them
+
+    Blocks recur across steps ("Great job!"), so translating each on its own
+    lets the translation cache serve repeats; uncached blocks are requested
+    in parallel.
+    """
+    language = target_language.lower()
+    translated = {}
+    if language != "english":
+        pending = [
+            block
+            for block in dict.fromkeys(blocks)
+            if (language, model, block) not in _TRANSLATION_CACHE
+        ]
+        if len(pending) > 1:
+            workers = min(len(pending), MAX_CONCURRENT_LLM_CALLS)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(
+                    lambda block: translate_text(block, target_language, model),
+                    pending,
+                )
+                translated = dict(zip(pending, results))
+
+    return "\n\n".join(
+        (
+            translated[block]
+            if block in translated
+            else translate_text(block, target_language, model)
+        )
+        for block in blocks
+    )
+
+
+def _static_texts(content_blocks):
+    """Return the content blocks whose text never changes at runtime
+
+    Blocks with {{template}} variables depend on metadata, so their rendered
+    text can't be translated ahead of time. Conditional blocks still qualify
+    since they are translated block by block once shown.
+    """
+    if not isinstance(content_blocks, list):
+        return []
+    texts = []
+    for block in content_blocks:
+        text = block.get("text") if isinstance(block, dict) else block
+        if isinstance(text, str) and "{{" not in text:
+            texts.append(text)
+    return texts
+
+
+def collect_static_texts(yaml_content):
+    """Collect every activity string whose translation can be precomputed"""
+    texts = []
+    for step in _iter_steps(yaml_content):
+        texts.extend(_static_texts(step.get("content_blocks")))
+        question = step.get("question")
+        if isinstance(question, str) and "{{" not in question:
+            texts.append(question)
+        transitions = step.get("transitions")
+        if isinstance(transitions, dict):
+            for transition in transitions.values():
+                if isinstance(transition, dict):
+                    texts.extend(_static_texts(transition.get("content_blocks")))
+    # Drop blanks and duplicates while keeping activity order
+    return list(dict.fromkeys(text for text in texts if text))
+
+
+def _feedback_models(yaml_content):
+    """Every feedback model an activity translates with, default first"""
+    default_model = yaml_content.get("feedback_model", "MODEL_1")
+    step_models = (step.get("feedback_model") for step in _iter_steps(yaml_content))
+    return tuple(dict.fromkeys([default_model, *filter(None, step_models)]))
+
+
+def load_translations(yaml_file_path, target_language, models=("MODEL_1",)):
+    """Seed the translation cache from an activity's translation file
+
+    The cache is keyed by model, so each translation is seeded under every
+    model in models; steps that override feedback_model still hit it.
+    Returns the number of translations loaded (0 if there is no file).
+    """
+    try:
+        with open(translation_cache_path(yaml_file_path, target_language)) as file:
+            translations = json.load(file)
+    except (OSError, ValueError):
+        return 0
+
+    language = target_language.lower()
+    for model in models:
+        for text, translation in translations.items():
+            _cache_put(
+                _TRANSLATION_CACHE,
+                (language, model, text),
+                translation,
+                TRANSLATION_CACHE_SIZE,
+            )
+    return len(translations)
+
+
+def precompute_translations(yaml_file_path, target_language, model=None):
+    """Translate all static activity text once and save it next to the YAML
+
+    Later runs of simulate_activity in target_language load the saved file,
+    so static content costs one API call per string instead of one per visit.
+    """
     yaml_content = load_yaml_activity(yaml_file_path)
+    model = model or yaml_content.get("feedback_model", "MODEL_1")
+    texts = collect_static_texts(yaml_content)
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_LLM_CALLS) as executor:
+        results = list(
+            executor.map(
+                lambda text: translate_text(text, target_language, model), texts
+            )
+        )
+
+    translations = {
+        text: translation
+        for text, translation in zip(texts, results)
+        if not translation.startswith("Error:")
+    }
+    path = translation_cache_path(yaml_file_path, target_language)
+    with open(path, "w") as file:
+        json.dump(translations, file, ensure_ascii=False, indent=2)
+    print(f"Saved {len(translations)}/{len(texts)} translations to {path}")
+    return translations
+
+
+def simulate_activity(yaml_file_path):
+    """Run an activity interactively from a YAML file path or text stream
+
+    Precomputed translation files sit next to the YAML file, so they are
+    only used when the activity is loaded from a path.
+    """
+    if hasattr(yaml_file_path, "read"):
+        yaml_content = parse_yaml_activity(yaml_file_path)
+        yaml_file_path = None
+    else:
+        yaml_content = load_yaml_activity(yaml_file_path)
     max_attempts = yaml_content.get("default_max_attempts_per_step", 3)
 
     # Get activity-level model defaults (default to MODEL_1 - Hermes)
@@ -375,22 +1180,16 @@ def simulate_activity(yaml_file_path):
 
     metadata = {"language": "English"}  # Default language
 
+    # Languages whose precomputed translation file has already been loaded,
+    # and the models it is seeded under
+    loaded_translation_languages = set()
+    translation_models = _feedback_models(yaml_content)
+
     while current_section_id and current_step_id:
         print(
             f"\n\nCurrent section: {current_section_id}, Current step: {current_step_id}\n\n"
         )
-        section = next(
-            (
-                s
-                for s in yaml_content["sections"]
-                if s["section_id"] == current_section_id
-            ),
-            None,
-        )
-
-        step = next(
-            (s for s in section["steps"] if s["step_id"] == current_step_id), None
-        )
+        step = get_step(yaml_content, current_section_id, current_step_id)
 
         # Get step-level model overrides (if specified), otherwise use activity defaults
         classifier_model = step.get("classifier_model", default_classifier_model)
@@ -398,6 +1197,10 @@ def simulate_activity(yaml_file_path):
 
         # Get the user's language preference from metadata
         user_language = metadata.get("language", "English")
+        if user_language.lower() not in loaded_translation_languages:
+            loaded_translation_languages.add(user_language.lower())
+            if user_language.lower() != "english" and yaml_file_path:
+                load_translations(yaml_file_path, user_language, translation_models)
 
         # Initialize attempts and max_attempts for this step
         attempts = 0
@@ -420,9 +1223,8 @@ def simulate_activity(yaml_file_path):
                 step["content_blocks"], metadata, context
             )
             if filtered_blocks:
-                content = "\n\n".join(filtered_blocks)
-                translated_content = translate_text(
-                    content, user_language, feedback_model
+                translated_content = _translate_blocks(
+                    filtered_blocks, user_language, feedback_model
                 )
                 print(translated_content)
 
@@ -438,6 +1240,14 @@ def simulate_activity(yaml_file_path):
         translated_question = translate_text(question, user_language, feedback_model)
         print(f"\nQuestion: {translated_question}")
 
+        # Only the user's response changes between attempts
+        classifier_system_prompt = build_classifier_system_prompt(
+            question,
+            step["buckets"],
+            step["tokens_for_ai"],
+            step.get("_bucket_list_str"),
+        )
+
         while attempts < step_max_attempts:
             # Update context with current attempt
             context = create_template_context(
@@ -482,13 +1292,22 @@ def simulate_activity(yaml_file_path):
                     metadata[key] = value
                 print(f"DEBUG: Pre-script completed, updated metadata")
 
-            category = categorize_response(
-                question,
-                user_response,
-                step["buckets"],
-                step["tokens_for_ai"],
-                classifier_model,
-            )
+            # Steps that opt in accept a verbatim bucket label (e.g. a menu
+            # choice) without asking the classifier
+            response_label = user_response.strip().lower().replace(" ", "_")
+            if step.get("match_bucket_labels") and response_label in step.get(
+                "_bucket_set", ()
+            ):
+                category = response_label
+            else:
+                category = categorize_response(
+                    question,
+                    user_response,
+                    step["buckets"],
+                    step["tokens_for_ai"],
+                    classifier_model,
+                    prebuilt_system=classifier_system_prompt,
+                )
             print(f"\nCategory: {category}")
 
             # Combine user's category with triggered random buckets
@@ -497,21 +1316,18 @@ def simulate_activity(yaml_file_path):
             print(f"📋 Processing buckets in order: {all_active_buckets}")
 
             # Find transitions for all active buckets
+            transitions_norm = step.get("_transitions_norm")
+            if transitions_norm is None:
+                transitions_norm = _normalize_bucket_keys(step["transitions"])
             active_transitions = []
             for bucket in all_active_buckets:
                 transition = None
-                if bucket in step["transitions"]:
-                    transition = step["transitions"][bucket]
-                elif str(bucket).isdigit() and int(bucket) in step["transitions"]:
-                    transition = step["transitions"][int(bucket)]
-                else:
-                    # Try boolean conversion
-                    if str(bucket).lower() in ["yes", "true"]:
-                        bucket = True
-                    elif str(bucket).lower() in ["no", "false"]:
-                        bucket = False
-                    if bucket in step["transitions"]:
-                        transition = step["transitions"][bucket]
+                key = _transition_key(step["transitions"], transitions_norm, bucket)
+                if key is not _NO_TRANSITION:
+                    transition = step["transitions"][key]
+                    # Boolean buckets are reported by their YAML key
+                    if isinstance(key, bool):
+                        bucket = key
 
                 if transition:
                     active_transitions.append((bucket, transition))
@@ -551,7 +1367,8 @@ def simulate_activity(yaml_file_path):
                         print(
                             f"⚠️  Skipping '{bucket_name}' - metadata conditions not met"
                         )
-                        print(f"Current Metadata: {json.dumps(metadata, indent=2)}")
+                        if DEBUG:
+                            print(f"Current Metadata: {json.dumps(metadata, indent=2)}")
                         continue
 
                 # Print transition content blocks if they exist (v2.0 with templates & conditionals)
@@ -572,116 +1389,28 @@ def simulate_activity(yaml_file_path):
                     )
 
                     if filtered_blocks:
-                        transition_content = "\n\n".join(filtered_blocks)
-                        translated_transition_content = translate_text(
-                            transition_content, user_language, feedback_model
+                        translated_transition_content = _translate_blocks(
+                            filtered_blocks, user_language, feedback_model
                         )
                         print(translated_transition_content)
 
-                # Update metadata based on user actions
-                if "metadata_add" in transition:
-                    for key, value in transition["metadata_add"].items():
-                        if value == "the-users-response":
-                            value = user_response
-                        elif isinstance(value, str):
-                            if value.startswith("n+random(") and value.endswith(")"):
-                                # Extract the range and apply the random increment
-                                range_values = value[9:-1].split(",")
-                                if len(range_values) == 2:
-                                    x, y = map(int, range_values)
-                                    value = metadata.get(key, 0) + random.randint(x, y)
-                            elif value.startswith("n+") or value.startswith("n-"):
-                                # Check if this is string concatenation (n+,value) or numeric operation (n+5)
-                                if value.startswith("n+,") or value.startswith("n-,"):
-                                    # String concatenation: append/remove from existing value
-                                    operation = value[:2]  # "n+" or "n-"
-                                    suffix = value[
-                                        3:
-                                    ]  # Everything after "n+," or "n-,"
-                                    existing_value = metadata.get(key, "")
-                                    if operation == "n+":
-                                        # Append with comma separator if existing value is non-empty
-                                        if existing_value:
-                                            value = f"{existing_value},{suffix}"
-                                        else:
-                                            value = suffix
-                                    elif operation == "n-":
-                                        # Remove suffix from existing value
-                                        if existing_value:
-                                            parts = existing_value.split(",")
-                                            parts = [p for p in parts if p != suffix]
-                                            value = ",".join(parts)
-                                        else:
-                                            value = existing_value
-                                else:
-                                    # Numeric operation: extract the numeric part c and apply the operation +/-
-                                    try:
-                                        c = int(value[2:])
-                                        if value.startswith("n+"):
-                                            value = metadata.get(key, 0) + c
-                                        elif value.startswith("n-"):
-                                            value = metadata.get(key, 0) - c
-                                    except ValueError:
-                                        print(
-                                            f"Warning: Invalid numeric operation '{value}' for key '{key}'"
-                                        )
-                                        # Leave value as-is if parsing fails
-                        metadata[key] = value
-
-                if "metadata_tmp_add" in transition:
-                    for key, value in transition["metadata_tmp_add"].items():
-                        if value == "the-users-response":
-                            value = user_response
-                        elif isinstance(value, str):
-                            if value.startswith("n+random(") and value.endswith(")"):
-                                # Extract the range and apply the random increment
-                                range_values = value[9:-1].split(",")
-                                if len(range_values) == 2:
-                                    x, y = map(int, range_values)
-                                    value = random.randint(x, y)
-                            elif value.startswith("n+") or value.startswith("n-"):
-                                # Check if this is string concatenation (n+,value) or numeric operation (n+5)
-                                if value.startswith("n+,") or value.startswith("n-,"):
-                                    # String concatenation: append/remove from existing value
-                                    operation = value[:2]  # "n+" or "n-"
-                                    suffix = value[
-                                        3:
-                                    ]  # Everything after "n+," or "n-,"
-                                    existing_value = metadata.get(key, "")
-                                    if operation == "n+":
-                                        # Append with comma separator if existing value is non-empty
-                                        if existing_value:
-                                            value = f"{existing_value},{suffix}"
-                                        else:
-                                            value = suffix
-                                    elif operation == "n-":
-                                        # Remove suffix from existing value
-                                        if existing_value:
-                                            parts = existing_value.split(",")
-                                            parts = [p for p in parts if p != suffix]
-                                            value = ",".join(parts)
-                                        else:
-                                            value = existing_value
-                                else:
-                                    # Numeric operation: extract the numeric part c and apply the operation +/-
-                                    try:
-                                        c = int(value[2:])
-                                        if value.startswith("n+"):
-                                            value = metadata.get(key, 0) + c
-                                        elif value.startswith("n-"):
-                                            value = metadata.get(key, 0) - c
-                                    except ValueError:
-                                        print(
-                                            f"Warning: Invalid numeric operation '{value}' for key '{key}'"
-                                        )
-                                        # Leave value as-is if parsing fails
-                        metadata[key] = value
-                        metadata_tmp_keys.append(key)  # Track temporary keys
+                # Update metadata based on user actions, using the operations
+                # compiled by prepare_activity when available
+                for section_key, ops_key in _METADATA_OPS_KEYS:
+                    if section_key not in transition:
+                        continue
+                    is_tmp = section_key == "metadata_tmp_add"
+                    ops = transition.get(ops_key) or _compile_metadata_ops(
+                        transition[section_key], is_tmp
+                    )
+                    for key, op in ops:
+                        metadata[key] = op(metadata, user_response)
+                        if is_tmp:
+                            metadata_tmp_keys.append(key)  # Track temporary keys
 
                 if "metadata_remove" in transition:
                     for key in transition["metadata_remove"]:
-                        if key in metadata:
-                            del metadata[key]
+                        metadata.pop(key, None)
 
                 # Handle metadata_clear - clear all metadata if set to True
                 if (
@@ -748,9 +1477,10 @@ def simulate_activity(yaml_file_path):
                     for key, value in result.get("metadata", {}).items():
                         metadata[key] = value
 
-                print(
-                    f"\n[Metadata after '{bucket_name}']: {json.dumps(metadata, indent=2)}"
-                )
+                if DEBUG:
+                    print(
+                        f"\n[Metadata after '{bucket_name}']: {json.dumps(metadata, indent=2)}"
+                    )
 
                 # Provide feedback for THIS bucket
                 if "feedback_prompts" in step:
@@ -773,6 +1503,15 @@ def simulate_activity(yaml_file_path):
                         print(f"\n{feedback_msg['name']}: {feedback_msg['content']}")
                 elif step.get("feedback_tokens_for_ai"):
                     # Legacy single feedback system - only if no feedback_prompts
+                    # Stream the feedback so the user sees the first tokens early
+                    streamed = []
+
+                    def print_delta(text):
+                        if not streamed:
+                            print("\nFeedback: \n\nAI Feedback: ", end="")
+                        streamed.append(text)
+                        print(text, end="", flush=True)
+
                     feedback = provide_feedback(
                         transition,
                         bucket_name,  # Use bucket_name instead of category
@@ -782,8 +1521,11 @@ def simulate_activity(yaml_file_path):
                         step.get("feedback_tokens_for_ai", ""),
                         metadata,
                         feedback_model,
+                        on_delta=print_delta,
                     )
-                    if feedback and feedback.strip():
+                    if streamed:
+                        print()
+                    elif feedback and feedback.strip():
                         print(f"\nFeedback: {feedback}")
 
                 # Track navigation (LAST transition's next_section_and_step wins)
@@ -818,13 +1560,7 @@ def simulate_activity(yaml_file_path):
                         any_counts_as_attempt = False
 
             # Check if we should break or continue attempting
-            if category not in [
-                "partial_understanding",
-                "limited_effort",
-                "asking_clarifying_questions",
-                "set_language",
-                "off_topic",
-            ]:
+            if category not in _RETRY_CATEGORIES:
                 break
 
             # Increment attempts if ANY transition counted
@@ -855,6 +1591,8 @@ def simulate_activity(yaml_file_path):
 
 
 if __name__ == "__main__":
+    import argparse
+
     parser = argparse.ArgumentParser(description="Simulate an activity.")
     parser.add_argument(
         "yaml_file_path",
@@ -862,5 +1600,13 @@ if __name__ == "__main__":
         help="Path to the activity YAML file",
         default="activity0.yaml",
     )
+    parser.add_argument(
+        "--precompute-translations",
+        metavar="LANGUAGE",
+        help="Translate the activity's static text into LANGUAGE, save it next to the YAML file, and exit",
+    )
     args = parser.parse_args()
-    simulate_activity(args.yaml_file_path)
+    if args.precompute_translations:
+        precompute_translations(args.yaml_file_path, args.precompute_translations)
+    else:
+        simulate_activity(args.yaml_file_path)
@@ -0,0 +1,65 @@
+"""
+pytest plugin that replaces tiktoken with an offline stub
+
+tiktoken tries to download encoding files over HTTPS which conflicts
+with gevent's monkey-patching of SSL, causing RecursionError. Loaded
+from tests/conftest.py via pytest_plugins; the stub is installed in
+pytest_configure, before any test module is collected or imported.
+"""
+
+import sys
+import types
+
+
+class MockTiktokenEncoding:
+    """Mock tiktoken encoding that doesn't make network requests"""
+
+    def encode(self, text):
+        # Simple approximation: ~4 chars per token. A range supports len(),
+        # indexing and iteration like a token list without allocating one
+        return range(len(text) // 4 + 1)
+
+
+# One shared encoding serves every model and encoding name
+_ENCODING = MockTiktokenEncoding()
+
+
+def encoding_for_model(model_name):
+    return _ENCODING
+
+
+def get_encoding(encoding_name):
+    return _ENCODING
+
+
+# A real module object, so attribute reads and patching behave like tiktoken
+MockTiktoken = types.ModuleType("tiktoken")
+MockTiktoken.encoding_for_model = encoding_for_model
+MockTiktoken.get_encoding = get_encoding
+
+
+# Set once the stub is in place, so repeated configure calls return early
+_TIKTOKEN_STUBBED = False
+
+
+def _install_tiktoken_stub():
+    """Put the mock in sys.modules, or patch a tiktoken that is already loaded"""
+    global _TIKTOKEN_STUBBED
+    if _TIKTOKEN_STUBBED:
+        return
+    if "tiktoken" not in sys.modules:
+        sys.modules["tiktoken"] = MockTiktoken
+    else:
+        # If tiktoken was already imported, patch its functions
+        tiktoken_mod = sys.modules["tiktoken"]
+        tiktoken_mod.encoding_for_model = encoding_for_model
+        tiktoken_mod.get_encoding = get_encoding
+    _TIKTOKEN_STUBBED = True
+
+
+def pytest_configure(config):
+    """
+    Called early in pytest startup, before test collection.
+    Ensures tiktoken is mocked before any test imports happen.
+    """
+    _install_tiktoken_stub()
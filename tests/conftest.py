@@ -5,123 +5,182 @@ pytest configuration and fixtures for OpenCompletion testing
 Sets up common test environment variables and fixtures used across all tests.
 """
 
-import sys
 import os
+import pytest
+from types import MappingProxyType
 
-# =============================================================================
-# CRITICAL: Mock tiktoken BEFORE any other imports
-# tiktoken tries to download encoding files over HTTPS which conflicts
-# with gevent's monkey-patching of SSL, causing RecursionError
-# =============================================================================
+from helpers import make_mock_client
 
+# Imported before any test module runs a patch.dict("sys.modules", ...) block,
+# which would otherwise evict yaml on exit. A re-imported yaml no longer
+# matches the node classes its cached C extension (CSafeLoader) was built for.
+import yaml  # noqa: F401
 
-class MockTiktokenEncoding:
-    """Mock tiktoken encoding that doesn't make network requests"""
-    def encode(self, text):
-        # Simple approximation: ~4 chars per token
-        return list(range(len(text) // 4 + 1))
+# Same for the SQLAlchemy stack, which app.py pulls in under those blocks;
+# a half re-imported sqlalchemy fails on its first query
+import flask_migrate  # noqa: F401
+import flask_sqlalchemy  # noqa: F401
+import sqlalchemy.orm  # noqa: F401
 
+# Mock tiktoken before any test module imports it
+pytest_plugins = ["_tiktoken_stub"]
 
-class MockTiktoken:
-    """Mock tiktoken module"""
-    _encoding = MockTiktokenEncoding()
+# Test environment variables, read-only so tests can't change them by accident
+TEST_ENV_VARS = MappingProxyType(
+    {
+        "MODEL_ENDPOINT_1": "https://test.api",
+        "MODEL_NAME_1": "test-model",
+        "MODEL_KEY_1": "test-key",
+        "TESTING": "1",
+    }
+)
 
-    @staticmethod
-    def encoding_for_model(model_name):
-        return MockTiktoken._encoding
 
-    @staticmethod
-    def get_encoding(encoding_name):
-        return MockTiktoken._encoding
+def pytest_configure(config):
+    """Apply the test environment before any test module is imported"""
+    os.environ.update(TEST_ENV_VARS)
 
 
-# Insert mock tiktoken into sys.modules BEFORE any imports
-# Use the class itself (not an instance) so patching works correctly
-if 'tiktoken' not in sys.modules:
-    sys.modules['tiktoken'] = MockTiktoken
+# Modules safe to spread across pytest-xdist workers. Marked here rather than
+# with pytestmark so the modules still run directly without pytest installed.
+# test_activity_flows.py runs everything in-process against YAML in memory.
+_PARALLEL_MODULES = frozenset({"test_activity_flows.py"})
 
 
-def pytest_configure(config):
-    """
-    Called early in pytest startup, before test collection.
-    Ensures tiktoken is mocked before any test imports happen.
-    """
-    if 'tiktoken' not in sys.modules:
-        sys.modules['tiktoken'] = MockTiktoken
-    else:
-        # If tiktoken was already imported, patch its functions
-        tiktoken_mod = sys.modules['tiktoken']
-        tiktoken_mod.encoding_for_model = MockTiktoken.encoding_for_model
-        tiktoken_mod.get_encoding = MockTiktoken.get_encoding
+def pytest_collection_modifyitems(config, items):
+    """Mark tests from _PARALLEL_MODULES as parallel"""
+    for item in items:
+        if item.path.name in _PARALLEL_MODULES:
+            item.add_marker(pytest.mark.parallel)
 
 
-# =============================================================================
-# Now safe to do other imports
-# =============================================================================
+# Canned S3 reply shared by the fake client below
+_S3_BODY = b"test: content"
 
-import pytest
-import tempfile
-from unittest.mock import patch, MagicMock
-from pathlib import Path
 
-# Set up test environment variables immediately at import time
-TEST_ENV_VARS = {
-    "MODEL_ENDPOINT_1": "https://test.api",
-    "MODEL_NAME_1": "test-model",
-    "MODEL_KEY_1": "test-key",
-    "TESTING": "1",
-}
+class _FakeBody:
+    """Stand-in for an S3 StreamingBody"""
 
-# Apply environment variables immediately for import
-os.environ.update(TEST_ENV_VARS)
+    def read(self):
+        return _S3_BODY
 
 
-@pytest.fixture(scope="session", autouse=True)
-def setup_test_environment():
-    """Set up test environment variables for all tests"""
-    with patch.dict(os.environ, TEST_ENV_VARS):
-        yield
+class _FakeS3:
+    """Stand-in for a boto3 S3 client"""
 
+    def get_object(self, **kwargs):
+        return _S3_RESPONSE
 
-@pytest.fixture
+
+_S3_RESPONSE = {"Body": _FakeBody()}
+_S3_CLIENT = _FakeS3()
+
+
+@pytest.fixture(scope="session")
 def mock_openai_client():
     """Mock OpenAI client for testing"""
-    mock_client = MagicMock()
-    mock_response = MagicMock()
-    mock_response.choices[0].message.content.strip.return_value = "test response"
-    mock_client.chat.completions.create.return_value = mock_response
-    return mock_client
+    client, _ = make_mock_client("test response")
+    return client
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_s3_client():
     """Mock S3 client for testing"""
-    mock_client = MagicMock()
-    mock_response = {"Body": MagicMock()}
-    mock_response["Body"].read.return_value.decode.return_value = "test: content"
-    mock_client.get_object.return_value = mock_response
-    return mock_client
-
-
-@pytest.fixture(scope="function")
-def test_app():
-    """Create a test Flask app with in-memory database"""
-    # Import here to avoid circular dependencies
-    import app as app_module
+    return _S3_CLIENT
+
+
+# Flask config for the app built by test_app
+_TEST_CONFIG = MappingProxyType(
+    {
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+        "WTF_CSRF_ENABLED": False,
+    }
+)
+
+
+@pytest.fixture(scope="session")
+def test_app(tmp_path_factory):
+    """Create a test Flask app with in-memory database, once per test run
+
+    A standalone app bound to models.db, like the integration suites use,
+    rather than app.py's: importing app.py monkey-patches the whole test
+    process with gevent and needs every provider SDK installed.
+    """
+    from flask import Flask
+    from models import db
+    from sqlalchemy.pool import StaticPool
+
+    test_app = Flask(__name__, instance_path=str(tmp_path_factory.mktemp("instance")))
+    test_app.config.update(_TEST_CONFIG)
+    # One shared connection, so every session sees the same in-memory schema
+    test_app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "poolclass": StaticPool,
+        "connect_args": {"check_same_thread": False},
+    }
+    db.init_app(test_app)
+
+    with test_app.app_context():
+        # The in-memory database is brand new and dies with its connection,
+        # so there is nothing to drop before creating tables or after the run,
+        # and create_all's per-table existence probes can be skipped
+        db.metadata.create_all(db.engine, checkfirst=False)
+    # No context stays pushed between tests, so suites that build their own
+    # app never fall back to this one
+    yield test_app
+    with test_app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def _rollback_session():
+    """Scoped session that db_session rebinds to each test's connection
+
+    Built once per run rather than per test; db_session installs it as
+    db.session only while a test runs.
+    """
+    from sqlalchemy.orm import scoped_session, sessionmaker
+
+    return scoped_session(sessionmaker(join_transaction_mode="create_savepoint"))
+
+
+@pytest.fixture
+def db_session(test_app, _rollback_session):
+    """Database session whose changes are rolled back after each test
+
+    The session is bound to an outer transaction on a single connection;
+    commits made by the test only release savepoints inside it.
+    """
+    from sqlalchemy import event
     from models import db
 
-    # Create a temporary directory for instance path
-    with tempfile.TemporaryDirectory() as tmpdir:
-        app_module.app.config["TESTING"] = True
-        app_module.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
-        app_module.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-        app_module.app.config["WTF_CSRF_ENABLED"] = False
-        app_module.app.instance_path = tmpdir
-
-        with app_module.app.app_context():
-            # Recreate all tables with test config
-            db.drop_all()
-            db.create_all()
-            yield app_module.app
-            db.session.remove()
-            db.drop_all()
+    app_context = test_app.app_context()
+    app_context.push()
+    connection = db.engine.connect()
+    # pysqlite's implicit transactions break SAVEPOINT; have SQLAlchemy
+    # emit BEGIN itself instead
+    sqlite_connection = connection.connection.driver_connection
+    isolation_level = sqlite_connection.isolation_level
+    sqlite_connection.isolation_level = None
+    event.listen(connection, "begin", _emit_begin)
+    transaction = connection.begin()
+    _rollback_session.configure(bind=connection)
+    app_session = db.session
+    db.session = _rollback_session
+    try:
+        yield _rollback_session
+    finally:
+        db.session = app_session
+        # Closing (not just expiring) is required: the session's transaction
+        # belongs to this test's connection, which is rolled back and closed
+        _rollback_session.remove()
+        transaction.rollback()
+        event.remove(connection, "begin", _emit_begin)
+        sqlite_connection.isolation_level = isolation_level
+        connection.close()
+        app_context.pop()
+
+
+def _emit_begin(connection):
+    connection.exec_driver_sql("BEGIN")
@@ -7,33 +7,117 @@ transitions work correctly, especially after our YAML changes.
 """
 
 import unittest
-import os
+import contextlib
+import hashlib
+import io
 import sys
-import tempfile
 import json
-from unittest.mock import patch, MagicMock, call
+import re
+from unittest.mock import Mock, patch
 from pathlib import Path
 
-# Add research directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent.parent / "research"))
-import guarded_ai
-
+RESEARCH_DIR = Path(__file__).resolve().parents[2] / "research"
+TESTS_DIR = Path(__file__).resolve().parents[1]
 
-class TestCompleteActivityFlows(unittest.TestCase):
+# Add research and tests directories to path
+sys.path.insert(0, str(RESEARCH_DIR))
+sys.path.insert(0, str(TESTS_DIR))
+import guarded_ai
+from helpers import make_mock_client
+
+# Parsed activities keyed by a digest of their YAML source. simulate_activity
+# never mutates the parsed activity, so tests can share a single copy.
+_ACTIVITY_CACHE = {}
+_parse_yaml_activity = guarded_ai.parse_yaml_activity
+
+
+def cached_parse_yaml_activity(stream):
+    """Drop-in for guarded_ai.parse_yaml_activity that parses each body once"""
+    source = stream if isinstance(stream, str) else stream.read()
+    key = hashlib.blake2b(source.encode()).digest()
+    if key not in _ACTIVITY_CACHE:
+        _ACTIVITY_CACHE[key] = _parse_yaml_activity(source)
+    return _ACTIVITY_CACHE[key]
+
+
+def use_activity_cache(test_class):
+    """Route a test class's simulate_activity parses through the cache"""
+    patcher = patch("guarded_ai.parse_yaml_activity", cached_parse_yaml_activity)
+    patcher.start()
+    test_class.addClassCleanup(patcher.stop)
+
+
+def use_mock_client(test_case, content=""):
+    """Patch guarded_ai's client lookup for one test, undone on cleanup"""
+    client, response = make_mock_client(content)
+    patcher = patch(
+        "guarded_ai.get_openai_client_and_model", return_value=(client, "test-model")
+    )
+    patcher.start()
+    test_case.addCleanup(patcher.stop)
+    return client, response
+
+
+def run_activity(activity_yaml, categories, user_inputs, debug=False):
+    """Run simulate_activity on YAML text with canned classifier categories
+    and user inputs, returning everything it printed
+
+    debug turns on guarded_ai's metadata dump for tests that assert on it.
+    """
+    with patch.multiple(
+        "guarded_ai",
+        categorize_response=Mock(side_effect=iter(categories)),
+        input=Mock(side_effect=iter(user_inputs)),
+        DEBUG=debug,
+        create=True,
+    ), contextlib.redirect_stdout(io.StringIO()) as output:
+        guarded_ai.simulate_activity(io.StringIO(activity_yaml))
+    return output.getvalue()
+
+
+def index_activity(activity):
+    """Walk a parsed activity once, grouping the nodes the tests look up"""
+    index = {"sections": {}, "metadata_remove": [], "integer_buckets": []}
+    for section in activity["sections"]:
+        index["sections"][section["section_id"]] = section
+        for step in section["steps"]:
+            for transition in step.get("transitions", {}).values():
+                if "metadata_remove" in transition:
+                    index["metadata_remove"].append(transition)
+            for bucket in step.get("buckets", ()):
+                if isinstance(bucket, int) and not isinstance(bucket, bool):
+                    index["integer_buckets"].append((bucket, step))
+    return index
+
+
+class OutputAssertions:
+    """Mixin for checking several substrings against captured output"""
+
+    def assertAllIn(self, needles, haystack):
+        """Assert every needle occurs in haystack, scanning it once
+
+        The lookahead alternation reports the longest needle starting at each
+        position, so a needle that is a prefix of another is re-checked.
+        """
+        needles = sorted(set(needles), key=len, reverse=True)
+        pattern = re.compile(
+            "(?=(" + "|".join(re.escape(needle) for needle in needles) + "))"
+        )
+        found = {match.group(1) for match in pattern.finditer(haystack)}
+        missing = [n for n in needles if n not in found and n not in haystack]
+        self.assertFalse(missing, f"Not found in output: {missing}")
+
+
+class TestCompleteActivityFlows(OutputAssertions, unittest.TestCase):
     """Test complete activity walkthroughs"""
 
+    @classmethod
+    def setUpClass(cls):
+        use_activity_cache(cls)
+
     def setUp(self):
         """Set up test environment with mock AI responses"""
-        self.mock_client = MagicMock()
-        self.mock_response = MagicMock()
-        self.mock_response.choices = [MagicMock()]
-        self.mock_client.chat.completions.create.return_value = self.mock_response
-
-    def create_test_activity(self, content):
-        """Create temporary activity YAML file"""
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".yaml", delete=False) as f:
-            f.write(content)
-            return f.name
+        self.mock_client, self.mock_response = use_mock_client(self)
 
     def test_integer_bucket_activity_flow(self):
         """Test complete flow using integer buckets (like activity20)"""
@@ -90,35 +174,21 @@ sections:
           - "Check your score in the metadata."
 """
 
-        with patch("guarded_ai.get_openai_client_and_model") as mock_get_client:
-            mock_get_client.return_value = (self.mock_client, "test-model")
-
-            # Test sequence: correct answer to q1, then reasonable answer to q2
-            mock_responses = ["1912", "reasonable"]
-
-            with patch("guarded_ai.categorize_response", side_effect=mock_responses):
-                with patch("guarded_ai.input", side_effect=["1912", "2000"]):
-                    with patch("builtins.print") as mock_print:
-
-                        activity_file = self.create_test_activity(activity_yaml)
-                        try:
-                            # This should complete the full flow
-                            guarded_ai.simulate_activity(activity_file)
+        # Test sequence: correct answer to q1, then reasonable answer to q2
+        mock_responses = ["1912", "reasonable"]
 
-                            # Check that we reached the final step
-                            print_calls = [
-                                call[0][0] for call in mock_print.call_args_list
-                            ]
-                            final_output = "\n".join(print_calls)
+        # This should complete the full flow
+        final_output = run_activity(activity_yaml, mock_responses, ["1912", "2000"])
 
-                            self.assertIn("Quiz completed!", final_output)
-                            self.assertIn(
-                                "Correct! The Titanic sank in 1912.", final_output
-                            )
-                            self.assertIn("Good estimate!", final_output)
-
-                        finally:
-                            os.unlink(activity_file)
+        # Check that we reached the final step
+        self.assertAllIn(
+            [
+                "Quiz completed!",
+                "Correct! The Titanic sank in 1912.",
+                "Good estimate!",
+            ],
+            final_output,
+        )
 
     def test_metadata_operations_flow(self):
         """Test flow with all metadata operations"""
@@ -186,32 +256,15 @@ sections:
               - "All metadata cleared!"
 """
 
-        with patch("guarded_ai.get_openai_client_and_model") as mock_get_client:
-            mock_get_client.return_value = (self.mock_client, "test-model")
-
-            # Mock AI feedback response
-            self.mock_response.choices[0].message.content = "Good job!"
-
-            mock_responses = ["ready", "continue", "test", "clear"]
-            user_inputs = ["TestUser", "yes", "yes", "yes"]
-
-            with patch("guarded_ai.categorize_response", side_effect=mock_responses):
-                with patch("guarded_ai.input", side_effect=user_inputs):
-                    with patch("builtins.print") as mock_print:
+        # Mock AI feedback response
+        self.mock_response.choices[0].message.content = "Good job!"
 
-                        activity_file = self.create_test_activity(activity_yaml)
-                        try:
-                            guarded_ai.simulate_activity(activity_file)
+        mock_responses = ["ready", "continue", "test", "clear"]
+        user_inputs = ["TestUser", "yes", "yes", "yes"]
 
-                            print_calls = [
-                                call[0][0] for call in mock_print.call_args_list
-                            ]
-                            final_output = "\n".join(print_calls)
+        final_output = run_activity(activity_yaml, mock_responses, user_inputs)
 
-                            self.assertIn("All metadata cleared!", final_output)
-
-                        finally:
-                            os.unlink(activity_file)
+        self.assertIn("All metadata cleared!", final_output)
 
     def test_processing_script_flow(self):
         """Test flow with processing scripts"""
@@ -260,32 +313,22 @@ sections:
               - "Check metadata for results."
 """
 
-        with patch("guarded_ai.get_openai_client_and_model") as mock_get_client:
-            mock_get_client.return_value = (self.mock_client, "test-model")
-
-            mock_responses = ["number", "done"]
-            user_inputs = ["42", "yes"]
-
-            with patch("guarded_ai.categorize_response", side_effect=mock_responses):
-                with patch("guarded_ai.input", side_effect=user_inputs):
-                    with patch("builtins.print") as mock_print:
+        mock_responses = ["number", "done"]
+        user_inputs = ["42", "yes"]
 
-                        activity_file = self.create_test_activity(activity_yaml)
-                        try:
-                            guarded_ai.simulate_activity(activity_file)
+        final_output = run_activity(
+            activity_yaml, mock_responses, user_inputs, debug=True
+        )
 
-                            print_calls = [
-                                call[0][0] for call in mock_print.call_args_list
-                            ]
-                            final_output = "\n".join(print_calls)
-
-                            self.assertIn("Processing completed!", final_output)
-                            # Should show metadata with processed values
-                            self.assertIn("parsed_number", final_output)
-                            self.assertIn("42", final_output)
-
-                        finally:
-                            os.unlink(activity_file)
+        self.assertAllIn(
+            [
+                "Processing completed!",
+                # Should show metadata with processed values
+                "parsed_number",
+                "42",
+            ],
+            final_output,
+        )
 
     def test_boolean_bucket_transitions(self):
         """Test boolean bucket transitions thoroughly"""
@@ -333,179 +376,157 @@ sections:
             (["false", "final"], ["no", "done"], "You disagreed!"),
         ]
 
-        for mock_responses, user_inputs, expected_content in test_cases:
-            with self.subTest(responses=mock_responses):
-                with patch("guarded_ai.get_openai_client_and_model") as mock_get_client:
-                    mock_get_client.return_value = (self.mock_client, "test-model")
-
-                    with patch(
-                        "guarded_ai.categorize_response", side_effect=mock_responses
-                    ):
-                        with patch("guarded_ai.input", side_effect=user_inputs):
-                            with patch("builtins.print") as mock_print:
-
-                                activity_file = self.create_test_activity(activity_yaml)
-                                try:
-                                    guarded_ai.simulate_activity(activity_file)
-
-                                    print_calls = [
-                                        call[0][0] for call in mock_print.call_args_list
-                                    ]
-                                    final_output = "\n".join(print_calls)
+        # Parse and patch once; each subTest only swaps the canned responses
+        activity = guarded_ai.parse_yaml_activity(activity_yaml)
+        categorize, user_input = Mock(), Mock()
+        with patch.multiple(
+            "guarded_ai",
+            parse_yaml_activity=Mock(return_value=activity),
+            categorize_response=categorize,
+            input=user_input,
+            create=True,
+        ):
+            for mock_responses, user_inputs, expected_content in test_cases:
+                with self.subTest(responses=mock_responses):
+                    categorize.side_effect = iter(mock_responses)
+                    user_input.side_effect = iter(user_inputs)
+                    with contextlib.redirect_stdout(io.StringIO()) as output:
+                        guarded_ai.simulate_activity(io.StringIO(activity_yaml))
+                    final_output = output.getvalue()
+
+                    self.assertAllIn(
+                        [expected_content, "Thank you for your response!"],
+                        final_output,
+                    )
+
+    def test_match_bucket_labels_skips_classifier(self):
+        """Test that an exact bucket label bypasses the classifier when opted in"""
+        activity_yaml = """
+sections:
+  - section_id: "menu"
+    title: "Menu"
+    steps:
+      - step_id: "choose"
+        title: "Choose"
+        question: "Pick a door: left or right?"
+        tokens_for_ai: "Categorize the door choice"
+        match_bucket_labels: true
+        buckets:
+          - left
+          - right
+        transitions:
+          left:
+            content_blocks:
+              - "You went left."
+          right:
+            content_blocks:
+              - "You went right."
+"""
 
-                                    self.assertIn(expected_content, final_output)
-                                    self.assertIn(
-                                        "Thank you for your response!", final_output
-                                    )
+        # An empty side_effect makes any classifier call raise StopIteration
+        final_output = run_activity(activity_yaml, [], ["  Right "])
 
-                                finally:
-                                    os.unlink(activity_file)
+        self.assertAllIn(["Category: right", "You went right."], final_output)
 
 
 class TestRealActivityFiles(unittest.TestCase):
     """Test our modified YAML files with complete flows"""
 
+    @classmethod
+    def setUpClass(cls):
+        """Parse each real activity file once for the whole class"""
+        cls._activity3 = guarded_ai.load_yaml_activity(RESEARCH_DIR / "activity3.yaml")
+        cls._activity17 = guarded_ai.load_yaml_activity(
+            RESEARCH_DIR / "activity17-choose-adventure.yaml"
+        )
+        cls._activity20 = guarded_ai.load_yaml_activity(
+            RESEARCH_DIR / "activity20-n-plus-1.yaml"
+        )
+        cls._index3 = index_activity(cls._activity3)
+        cls._index17 = index_activity(cls._activity17)
+        cls._index20 = index_activity(cls._activity20)
+
     def setUp(self):
         """Set up test environment"""
-        self.mock_client = MagicMock()
-        self.mock_response = MagicMock()
-        self.mock_response.choices = [MagicMock()]
-        self.mock_response.choices[0].message.content = "Test response"
-        self.mock_client.chat.completions.create.return_value = self.mock_response
+        self.mock_client, self.mock_response = use_mock_client(self, "Test response")
 
     def test_activity3_terminal_section_flow(self):
         """Test that activity3 flows to the new terminal section"""
-        with patch("guarded_ai.get_openai_client_and_model") as mock_get_client:
-            mock_get_client.return_value = (self.mock_client, "test-model")
-
-            # Load actual activity3.yaml
-            activity_file = (
-                Path(__file__).parent.parent.parent / "research" / "activity3.yaml"
-            )
-            activity = guarded_ai.load_yaml_activity(str(activity_file))
-
-            # Should have section_5 as the terminal section
-            section_5 = None
-            for section in activity["sections"]:
-                if section["section_id"] == "section_5":
-                    section_5 = section
-                    break
-
-            self.assertIsNotNone(section_5, "Should have section_5")
-
-            # Terminal section should not have questions or transitions with next_section_and_step
-            terminal_step = section_5["steps"][0]
-            self.assertNotIn("question", terminal_step)
-            self.assertNotIn("buckets", terminal_step)
-            self.assertNotIn("transitions", terminal_step)
-
-            # Should have congratulatory content
-            content = "\n".join(terminal_step["content_blocks"])
-            self.assertIn("Congratulations", content)
-            self.assertIn("elephant expert", content)
+        # Should have section_5 as the terminal section
+        section_5 = self._index3["sections"].get("section_5")
+        self.assertIsNotNone(section_5, "Should have section_5")
+
+        # Terminal section should not have questions or transitions with next_section_and_step
+        terminal_step = section_5["steps"][0]
+        self.assertNotIn("question", terminal_step)
+        self.assertNotIn("buckets", terminal_step)
+        self.assertNotIn("transitions", terminal_step)
+
+        # Should have congratulatory content
+        content = "\n".join(terminal_step["content_blocks"])
+        self.assertIn("Congratulations", content)
+        self.assertIn("elephant expert", content)
 
     def test_activity17_metadata_remove_flow(self):
         """Test activity17 with new metadata_remove format"""
-        with patch("guarded_ai.get_openai_client_and_model") as mock_get_client:
-            mock_get_client.return_value = (self.mock_client, "test-model")
-
-            activity_file = (
-                Path(__file__).parent.parent.parent
-                / "research"
-                / "activity17-choose-adventure.yaml"
-            )
-            activity = guarded_ai.load_yaml_activity(str(activity_file))
-
-            # Find a step with metadata_remove operations
-            found_remove_operation = False
-            for section in activity["sections"]:
-                for step in section["steps"]:
-                    if "transitions" in step:
-                        for transition in step["transitions"].values():
-                            if "metadata_remove" in transition:
-                                found_remove_operation = True
-
-                                # Should be list format now
-                                remove_op = transition["metadata_remove"]
-                                self.assertIsInstance(remove_op, list)
-
-                                # Test the actual removal logic
-                                test_metadata = {
-                                    "old_key": "old_value",
-                                    "keep_key": "keep_value",
-                                }
-
-                                # Simulate metadata removal
-                                for key in remove_op:
-                                    if key in test_metadata:
-                                        del test_metadata[key]
-
-                                # Should have removed the keys
-                                for key in remove_op:
-                                    self.assertNotIn(key, test_metadata)
-
-            self.assertTrue(
-                found_remove_operation, "Should find metadata_remove operations"
-            )
+        # Every transition with metadata_remove operations
+        remove_transitions = self._index17["metadata_remove"]
+        self.assertTrue(remove_transitions, "Should find metadata_remove operations")
+
+        for transition in remove_transitions:
+            # Should be list format now
+            remove_op = transition["metadata_remove"]
+            self.assertIsInstance(remove_op, list)
+
+            # Test the actual removal logic
+            test_metadata = {
+                "old_key": "old_value",
+                "keep_key": "keep_value",
+            }
+
+            # Simulate metadata removal
+            for key in remove_op:
+                if key in test_metadata:
+                    del test_metadata[key]
+
+            # Should have removed the keys
+            for key in remove_op:
+                self.assertNotIn(key, test_metadata)
 
     def test_activity20_integer_bucket_flow(self):
         """Test activity20 with integer buckets"""
-        with patch("guarded_ai.get_openai_client_and_model") as mock_get_client:
-            mock_get_client.return_value = (self.mock_client, "test-model")
-
-            activity_file = (
-                Path(__file__).parent.parent.parent
-                / "research"
-                / "activity20-n-plus-1.yaml"
-            )
-            activity = guarded_ai.load_yaml_activity(str(activity_file))
-
-            # Find the step with integer bucket (1912)
-            found_integer_bucket = False
-            for section in activity["sections"]:
-                for step in section["steps"]:
-                    if "buckets" in step:
-                        for bucket in step["buckets"]:
-                            if bucket == 1912:  # Integer bucket
-                                found_integer_bucket = True
-
-                                # Test transition matching logic
-                                transitions = step["transitions"]
-                                category = "1912"  # AI response as string
-
-                                # Test our matching logic
-                                transition = None
-                                if category in transitions:
-                                    transition = transitions[category]
-                                elif (
-                                    category.isdigit() and int(category) in transitions
-                                ):
-                                    transition = transitions[int(category)]
-
-                                self.assertIsNotNone(
-                                    transition, "Should match integer bucket"
-                                )
-                                self.assertIn("1912", transition["content_blocks"][0])
-
-            self.assertTrue(found_integer_bucket, "Should find integer bucket (1912)")
-
-
-class TestPreScriptFunctionality(unittest.TestCase):
+        # Find the step with integer bucket (1912)
+        steps = [
+            step for bucket, step in self._index20["integer_buckets"] if bucket == 1912
+        ]
+        self.assertTrue(steps, "Should find integer bucket (1912)")
+
+        for step in steps:
+            # Test transition matching logic
+            transitions = step["transitions"]
+            category = "1912"  # AI response as string
+
+            # Test our matching logic
+            transition = None
+            if category in transitions:
+                transition = transitions[category]
+            elif category.isdigit() and int(category) in transitions:
+                transition = transitions[int(category)]
+
+            self.assertIsNotNone(transition, "Should match integer bucket")
+            self.assertIn("1912", transition["content_blocks"][0])
+
+
+class TestPreScriptFunctionality(OutputAssertions, unittest.TestCase):
     """Test pre_script execution (runs before categorization)"""
 
+    @classmethod
+    def setUpClass(cls):
+        use_activity_cache(cls)
+
     def setUp(self):
         """Set up test environment"""
-        self.mock_client = MagicMock()
-        self.mock_response = MagicMock()
-        self.mock_response.choices = [MagicMock()]
-        self.mock_response.choices[0].message.content = "valid"
-        self.mock_client.chat.completions.create.return_value = self.mock_response
-
-    def create_test_activity(self, content):
-        """Create temporary activity YAML file"""
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".yaml", delete=False) as f:
-            f.write(content)
-            return f.name
+        self.mock_client, self.mock_response = use_mock_client(self, "valid")
 
     def test_pre_script_battleship_scenario(self):
         """Test pre_script with battleship-like win detection"""
@@ -564,38 +585,26 @@ sections:
             next_section_and_step: "game:play"
 """
 
-        with patch("guarded_ai.get_openai_client_and_model") as mock_get_client:
-            mock_get_client.return_value = (self.mock_client, "test-model")
-
-            # Test sequence: setup, then winning move
-            mock_responses = ["ready", "winning_move"]
-            user_inputs = ["yes", "42"]  # 42 is the winning move
-
-            with patch("guarded_ai.categorize_response", side_effect=mock_responses):
-                with patch("guarded_ai.input", side_effect=user_inputs):
-                    with patch("builtins.print") as mock_print:
-
-                        activity_file = self.create_test_activity(activity_yaml)
-                        try:
-                            guarded_ai.simulate_activity(activity_file)
-
-                            print_calls = [
-                                call[0][0] for call in mock_print.call_args_list
-                            ]
-                            final_output = "\n".join(print_calls)
-
-                            # Should show debug messages for pre-script execution
-                            self.assertIn("DEBUG: Executing pre-script", final_output)
-                            self.assertIn("DEBUG: Pre-script completed", final_output)
-
-                            # Should show winning message
-                            self.assertIn("You hit the target! You win!", final_output)
-
-                            # Metadata should show game ending move detected
-                            self.assertIn('"is_game_ending_move": true', final_output)
-
-                        finally:
-                            os.unlink(activity_file)
+        # Test sequence: setup, then winning move
+        mock_responses = ["ready", "winning_move"]
+        user_inputs = ["yes", "42"]  # 42 is the winning move
+
+        final_output = run_activity(
+            activity_yaml, mock_responses, user_inputs, debug=True
+        )
+
+        self.assertAllIn(
+            [
+                # Should show debug messages for pre-script execution
+                "DEBUG: Executing pre-script",
+                "DEBUG: Pre-script completed",
+                # Should show winning message
+                "You hit the target! You win!",
+                # Metadata should show game ending move detected
+                '"is_game_ending_move": true',
+            ],
+            final_output,
+        )
 
     def test_pre_script_metadata_processing(self):
         """Test pre_script processes user input and updates metadata"""
@@ -646,57 +655,39 @@ sections:
             next_section_and_step: "input_processing:number_input"
 """
 
-        with patch("guarded_ai.get_openai_client_and_model") as mock_get_client:
-            mock_get_client.return_value = (self.mock_client, "test-model")
-
-            # Test with valid number
-            mock_responses = ["valid"]
-            user_inputs = ["50"]
-
-            with patch("guarded_ai.categorize_response", side_effect=mock_responses):
-                with patch("guarded_ai.input", side_effect=user_inputs):
-                    with patch("builtins.print") as mock_print:
-
-                        activity_file = self.create_test_activity(activity_yaml)
-                        try:
-                            guarded_ai.simulate_activity(activity_file)
-
-                            print_calls = [
-                                call[0][0] for call in mock_print.call_args_list
-                            ]
-                            final_output = "\n".join(print_calls)
-
-                            # Should show pre-script execution
-                            self.assertIn("DEBUG: Executing pre-script", final_output)
-
-                            # Should show valid input message
-                            self.assertIn("Valid number received!", final_output)
-
-                            # Metadata should show processed values
-                            self.assertIn('"is_valid_input": true', final_output)
-                            self.assertIn('"parsed_number": 50', final_output)
-                            self.assertIn('"processing_complete": true', final_output)
-
-                        finally:
-                            os.unlink(activity_file)
-
-
-class TestErrorHandling(unittest.TestCase):
+        # Test with valid number
+        mock_responses = ["valid"]
+        user_inputs = ["50"]
+
+        final_output = run_activity(
+            activity_yaml, mock_responses, user_inputs, debug=True
+        )
+
+        self.assertAllIn(
+            [
+                # Should show pre-script execution
+                "DEBUG: Executing pre-script",
+                # Should show valid input message
+                "Valid number received!",
+                # Metadata should show processed values
+                '"is_valid_input": true',
+                '"parsed_number": 50',
+                '"processing_complete": true',
+            ],
+            final_output,
+        )
+
+
+class TestErrorHandling(OutputAssertions, unittest.TestCase):
     """Test error handling in activity flows"""
 
+    @classmethod
+    def setUpClass(cls):
+        use_activity_cache(cls)
+
     def setUp(self):
         """Set up test environment"""
-        self.mock_client = MagicMock()
-        self.mock_response = MagicMock()
-        self.mock_response.choices = [MagicMock()]
-        self.mock_response.choices[0].message.content = "unknown"
-        self.mock_client.chat.completions.create.return_value = self.mock_response
-
-    def create_test_activity(self, content):
-        """Create temporary activity YAML file"""
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".yaml", delete=False) as f:
-            f.write(content)
-            return f.name
+        self.mock_client, self.mock_response = use_mock_client(self, "unknown")
 
     def test_invalid_transition_handling(self):
         """Test handling of invalid AI responses"""
@@ -721,32 +712,14 @@ sections:
               - "Invalid response!"
 """
 
-        with patch("guarded_ai.get_openai_client_and_model") as mock_get_client:
-            mock_get_client.return_value = (self.mock_client, "test-model")
-
-            # Mock categorize_response to return unknown category first, then valid
-            with patch(
-                "guarded_ai.categorize_response", side_effect=["unknown", "valid"]
-            ):
-                with patch(
-                    "guarded_ai.input", side_effect=["test input", "valid input"]
-                ):
-                    with patch("builtins.print") as mock_print:
-
-                        activity_file = self.create_test_activity(activity_yaml)
-                        try:
-                            guarded_ai.simulate_activity(activity_file)
-
-                            print_calls = [
-                                call[0][0] for call in mock_print.call_args_list
-                            ]
-                            final_output = "\n".join(print_calls)
+        # Mock categorize_response to return unknown category first, then valid
 
-                            # Should show error message for invalid transition
-                            self.assertIn("No valid transition found", final_output)
+        final_output = run_activity(
+            activity_yaml, ["unknown", "valid"], ["test input", "valid input"]
+        )
 
-                        finally:
-                            os.unlink(activity_file)
+        # Should show error message for invalid transition
+        self.assertIn("No valid transition found", final_output)
 
 
 if __name__ == "__main__":
@@ -33,6 +33,16 @@ with patch.dict(
     import app
     import activity
 
+# orjson is optional; it only speeds up MockBattleshipState.json_metadata
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj).decode()
+
+except ImportError:
+    _dumps = json.dumps
+
 
 class MockBattleshipState:
     """Mock battleship activity state for testing"""
@@ -43,7 +53,6 @@ class MockBattleshipState:
         self.attempts = 0
         self.max_attempts = 9
         self.dict_metadata = {}
-        self.json_metadata = "{}"
         self.s3_file_path = "activity29-battleship.yaml"
 
         # Initialize with typical battleship metadata
@@ -61,39 +70,41 @@ class MockBattleshipState:
                 "ai_sunk_ships": [],
             }
         )
-        self.json_metadata = json.dumps(self.dict_metadata)
+
+    @property
+    def json_metadata(self):
+        # Serialized on read; the tests never look at it between mutations
+        return _dumps(self.dict_metadata)
 
     def add_metadata(self, key, value):
         self.dict_metadata[key] = value
-        self.json_metadata = json.dumps(self.dict_metadata)
 
     def remove_metadata(self, key):
-        if key in self.dict_metadata:
-            del self.dict_metadata[key]
-            self.json_metadata = json.dumps(self.dict_metadata)
+        self.dict_metadata.pop(key, None)
 
 
 class TestBattleshipGameFlow(unittest.TestCase):
     """Test complete battleship game scenarios"""
 
-    def setUp(self):
-        """Set up battleship test fixtures"""
+    @classmethod
+    def setUpClass(cls):
+        """Build the battleship boards once; no test mutates them"""
         # Sample board with ships placed
-        self.user_board = [-1] * 100  # Empty board
-        self.ai_board = [-1] * 100  # Empty board
+        cls.user_board = [-1] * 100  # Empty board
+        cls.ai_board = [-1] * 100  # Empty board
 
         # Place a destroyer (size 2) at positions 0, 1
-        self.ai_board[0] = "Destroyer"
-        self.ai_board[1] = "Destroyer"
+        cls.ai_board[0] = "Destroyer"
+        cls.ai_board[1] = "Destroyer"
 
         # Place a cruiser (size 3) at positions 10, 20, 30 (vertical)
-        self.user_board[10] = "Cruiser"
-        self.user_board[20] = "Cruiser"
-        self.user_board[30] = "Cruiser"
+        cls.user_board[10] = "Cruiser"
+        cls.user_board[20] = "Cruiser"
+        cls.user_board[30] = "Cruiser"
 
-        self.battleship_state = MockBattleshipState()
-        self.battleship_state.add_metadata("user_board", self.user_board)
-        self.battleship_state.add_metadata("ai_board", self.ai_board)
+        cls.battleship_state = MockBattleshipState()
+        cls.battleship_state.add_metadata("user_board", cls.user_board)
+        cls.battleship_state.add_metadata("ai_board", cls.ai_board)
 
     def test_battleship_setup_and_board_generation(self):
         """Test battleship game setup and board generation"""
@@ -111,28 +122,26 @@ def place_ships():
     }
     
     board = [-1] * 100
+    # Bit i of occupied is set once cell i holds a ship
+    occupied = 0
     for ship, size in ships.items():
-        placed = False
-        attempts = 0
-        while not placed and attempts < 100:
-            orientation = random.choice(['horizontal', 'vertical'])
-            if orientation == 'horizontal':
-                row = random.randint(0, 9)
-                col = random.randint(0, 9 - size)
-                start = row * 10 + col
-                if all(board[start + i] == -1 for i in range(size)):
-                    for i in range(size):
-                        board[start + i] = ship
-                    placed = True
-            else:
-                row = random.randint(0, 9 - size)
-                col = random.randint(0, 9)
-                start = row * 10 + col
-                if all(board[start + i * 10] == -1 for i in range(size)):
-                    for i in range(size):
-                        board[start + i * 10] = ship
-                    placed = True
-            attempts += 1
+        horizontal = (1 << size) - 1
+        vertical = sum(1 << (i * 10) for i in range(size))
+        # Enumerate every start that fits, so one random pick always succeeds
+        candidates = [
+            (row * 10 + col, horizontal, 1)
+            for row in range(10)
+            for col in range(11 - size)
+            if not (occupied >> (row * 10 + col)) & horizontal
+        ] + [
+            (start, vertical, 10)
+            for start in range((11 - size) * 10)
+            if not (occupied >> start) & vertical
+        ]
+        start, shape, stride = random.choice(candidates)
+        occupied |= shape << start
+        # Extended slice writes the whole ship along its row or column stride
+        board[start : start + size * stride : stride] = [ship] * size
     return board
 
 user_board = place_ships()
@@ -146,50 +155,40 @@ script_result = {
 }
 """
 
-        # Mock the script execution since it involves complex ship placement
-        mock_metadata = {"user_board": [-1] * 100, "ai_board": [-1] * 100}
-
-        # Place some ships for testing
-        mock_metadata["user_board"][0:5] = ["Carrier"] * 5  # Carrier
-        mock_metadata["user_board"][10:14] = ["Battleship"] * 4  # Battleship
-        mock_metadata["user_board"][20:23] = ["Cruiser"] * 3  # Cruiser
-        mock_metadata["user_board"][30:33] = ["Submarine"] * 3  # Submarine
-        mock_metadata["user_board"][40:42] = ["Destroyer"] * 2  # Destroyer
-
-        mock_metadata["ai_board"][50:55] = ["Carrier"] * 5  # Carrier
-        mock_metadata["ai_board"][60:64] = ["Battleship"] * 4  # Battleship
-        mock_metadata["ai_board"][70:73] = ["Cruiser"] * 3  # Cruiser
-        mock_metadata["ai_board"][80:83] = ["Submarine"] * 3  # Submarine
-        mock_metadata["ai_board"][90:92] = ["Destroyer"] * 2  # Destroyer
-
-        with patch.object(
-            activity,
-            "execute_processing_script",
-            return_value={"metadata": mock_metadata},
-        ) as mock_exec:
-            metadata = {}
-            result = activity.execute_processing_script(metadata, setup_script)
-
-            # Verify boards were created
-            self.assertIn("user_board", result["metadata"])
-            self.assertIn("ai_board", result["metadata"])
-
-            user_board = result["metadata"]["user_board"]
-            ai_board = result["metadata"]["ai_board"]
-
-            # Verify boards are correct size
-            self.assertEqual(len(user_board), 100)
-            self.assertEqual(len(ai_board), 100)
-
-            # Count ship cells
-            user_ship_cells = sum(1 for cell in user_board if cell != -1)
-            ai_ship_cells = sum(1 for cell in ai_board if cell != -1)
-
-            # Should have exactly 17 ship cells (5+4+3+3+2)
-            self.assertEqual(user_ship_cells, 17)
-            self.assertEqual(ai_ship_cells, 17)
+        ship_sizes = {
+            "Carrier": 5,
+            "Battleship": 4,
+            "Cruiser": 3,
+            "Submarine": 3,
+            "Destroyer": 2,
+        }
 
-            mock_exec.assert_called_once()
+        # Placement is random; a handful of seeds covers both orientations
+        self.addCleanup(random.setstate, random.getstate())
+        for seed in range(20):
+            random.seed(seed)
+            result = activity.execute_processing_script({}, setup_script)
+
+            for board_name in ("user_board", "ai_board"):
+                board = result["metadata"][board_name]
+                self.assertEqual(len(board), 100)
+
+                # Should have exactly 17 ship cells (5+4+3+3+2); an overlap
+                # would overwrite a cell and leave fewer
+                self.assertEqual(sum(1 for cell in board if cell != -1), 17)
+
+                for ship, size in ship_sizes.items():
+                    cells = [pos for pos, cell in enumerate(board) if cell == ship]
+                    self.assertEqual(len(cells), size, (seed, board_name, ship))
+
+                    # Each ship runs along one row or down one column
+                    rows = {pos // 10 for pos in cells}
+                    horizontal = cells == list(range(cells[0], cells[0] + size))
+                    vertical = cells == list(range(cells[0], cells[0] + 10 * size, 10))
+                    self.assertTrue(
+                        (horizontal and len(rows) == 1) or vertical,
+                        (seed, board_name, ship, cells),
+                    )
 
     def test_battleship_shot_processing(self):
         """Test processing a shot in battleship"""
@@ -202,9 +201,11 @@ user_shots = metadata.get("user_shots", [])
 ai_shots = metadata.get("ai_shots", [])
 user_hits = metadata.get("user_hits", [])
 ai_hits = metadata.get("ai_hits", [])
+user_shots_set = set(user_shots)
+ai_shots_set = set(ai_shots)
 
 # Process user shot
-if 0 <= user_shot < 100 and user_shot not in user_shots:
+if 0 <= user_shot < 100 and user_shot not in user_shots_set:
     user_shots.append(user_shot)
     user_hit_result = "miss"
     if ai_board[user_shot] != -1:
@@ -212,7 +213,7 @@ if 0 <= user_shot < 100 and user_shot not in user_shots:
         user_hit_result = "hit"
     
     # AI makes random shot
-    available_positions = [i for i in range(100) if i not in ai_shots]
+    available_positions = [i for i in range(100) if i not in ai_shots_set]
     if available_positions:
         ai_shot = available_positions[0]  # Deterministic for testing
         ai_shots.append(ai_shot)
@@ -263,16 +264,19 @@ if 0 <= user_shot < 100 and user_shot not in user_shots:
     def test_battleship_ship_sinking_logic(self):
         """Test ship sinking detection"""
         sinking_script = """
-# Ship sinking detection logic
-def check_sunk(board, hits, ship_name):
-    ship_positions = []
-    for i, ship in enumerate(board):
-        if ship == ship_name:
-            ship_positions.append(i)
-    for pos in ship_positions:
-        if pos not in hits:
-            return False
-    return True
+# Ship sinking detection logic using bitboards: bit i is cell i
+def ship_masks(board):
+    masks = {}
+    for pos, ship in enumerate(board):
+        if ship != -1:
+            masks[ship] = masks.get(ship, 0) | (1 << pos)
+    return masks
+
+def hits_to_mask(hits):
+    mask = 0
+    for pos in hits:
+        mask |= 1 << pos
+    return mask
 
 user_board = metadata.get("user_board")
 ai_board = metadata.get("ai_board") 
@@ -281,26 +285,24 @@ ai_hits = metadata.get("ai_hits", [])
 user_sunk_ships = metadata.get("user_sunk_ships", [])
 ai_sunk_ships = metadata.get("ai_sunk_ships", [])
 
-ship_sizes = {
-    "Carrier": 5,
-    "Battleship": 4,
-    "Cruiser": 3,
-    "Submarine": 3,
-    "Destroyer": 2
-}
-
 user_sunk_ship_this_round = None
 ai_sunk_ship_this_round = None
 
-# Check if any AI ship is sunk
-for ship_name in ship_sizes.keys():
-    if check_sunk(ai_board, user_hits, ship_name) and ship_name not in user_sunk_ships:
+ai_ship_masks = ship_masks(ai_board)
+user_ship_masks = ship_masks(user_board)
+user_hits_mask = hits_to_mask(user_hits)
+ai_hits_mask = hits_to_mask(ai_hits)
+
+# Check if any AI ship is sunk; only ships actually on the board, skipping
+# those already recorded before testing their mask
+for ship_name, mask in ai_ship_masks.items():
+    if ship_name not in user_sunk_ships and not (mask & ~user_hits_mask):
         user_sunk_ships.append(ship_name)
         user_sunk_ship_this_round = ship_name
 
-# Check if any User ship is sunk  
-for ship_name in ship_sizes.keys():
-    if check_sunk(user_board, ai_hits, ship_name) and ship_name not in ai_sunk_ships:
+# Check if any User ship is sunk
+for ship_name, mask in user_ship_masks.items():
+    if ship_name not in ai_sunk_ships and not (mask & ~ai_hits_mask):
         ai_sunk_ships.append(ship_name)
         ai_sunk_ship_this_round = ship_name
 
@@ -324,31 +326,15 @@ script_result = {
             "ai_sunk_ships": [],
         }
 
-        mock_result = {
-            "metadata": {
-                "user_sunk_ships": ["Destroyer"],
-                "ai_sunk_ships": [],
-                "user_sunk_ship_this_round": "Destroyer",
-                "ai_sunk_ship_this_round": None,
-            }
-        }
-
-        with patch.object(
-            activity, "execute_processing_script", return_value=mock_result
-        ) as mock_exec:
-            result = activity.execute_processing_script(metadata, sinking_script)
+        result = activity.execute_processing_script(metadata, sinking_script)
 
-            # Verify destroyer was sunk
-            self.assertIn("Destroyer", result["metadata"]["user_sunk_ships"])
-            self.assertEqual(
-                result["metadata"]["user_sunk_ship_this_round"], "Destroyer"
-            )
+        # Verify destroyer was sunk
+        self.assertIn("Destroyer", result["metadata"]["user_sunk_ships"])
+        self.assertEqual(result["metadata"]["user_sunk_ship_this_round"], "Destroyer")
 
-            # Verify cruiser was not sunk (only 1 of 3 positions hit)
-            self.assertNotIn("Cruiser", result["metadata"]["ai_sunk_ships"])
-            self.assertIsNone(result["metadata"]["ai_sunk_ship_this_round"])
-
-            mock_exec.assert_called_once()
+        # Verify cruiser was not sunk (only 1 of 3 positions hit)
+        self.assertNotIn("Cruiser", result["metadata"]["ai_sunk_ships"])
+        self.assertIsNone(result["metadata"]["ai_sunk_ship_this_round"])
 
     def test_battleship_win_condition(self):
         """Test win condition detection"""
@@ -358,19 +344,23 @@ ai_board = metadata.get("ai_board")
 user_hits = metadata.get("user_hits", [])
 ai_hits = metadata.get("ai_hits", [])
 
-# Check if all AI ships are hit
-all_ai_ships_hit = True
-for pos in range(100):
-    if ai_board[pos] != -1 and pos not in user_hits:
-        all_ai_ships_hit = False
-        break
+# Boards and hits as bitmasks: bit i is set for cell i
+def board_to_mask(board):
+    mask = 0
+    for pos, cell in enumerate(board):
+        if cell != -1:
+            mask |= 1 << pos
+    return mask
 
-# Check if all User ships are hit
-all_user_ships_hit = True
-for pos in range(100):
-    if user_board[pos] != -1 and pos not in ai_hits:
-        all_user_ships_hit = False
-        break
+def hits_to_mask(hits):
+    mask = 0
+    for pos in hits:
+        mask |= 1 << pos
+    return mask
+
+# A player has won once no ship bit is left without a hit bit
+all_ai_ships_hit = (board_to_mask(ai_board) & ~hits_to_mask(user_hits)) == 0
+all_user_ships_hit = (board_to_mask(user_board) & ~hits_to_mask(ai_hits)) == 0
 
 game_over = False
 user_wins = False
@@ -427,9 +417,10 @@ script_result = {
 import random
 ai_mode = "random"
 ai_shots = metadata.get("ai_shots", [])
+ai_shots_set = set(ai_shots)
 
 # Random AI - just picks randomly from available positions
-available_positions = [i for i in range(100) if i not in ai_shots]
+available_positions = [i for i in range(100) if i not in ai_shots_set]
 if available_positions:
     ai_shot = random.choice(available_positions)
 else:
@@ -456,31 +447,33 @@ script_result = {
 ai_mode = "hunter"
 ai_shots = metadata.get("ai_shots", [])
 ai_hits = metadata.get("ai_hits", [])
+ai_shots_set = set(ai_shots)
 
-def generate_hunt_targets(hit_position, ai_shots):
-    potential_targets = []
-    row, col = divmod(hit_position, 10)
-    
-    # Adjacent positions
-    for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-        new_row, new_col = row + dr, col + dc
-        if 0 <= new_row < 10 and 0 <= new_col < 10:
-            pos = new_row * 10 + new_col
-            if pos not in ai_shots:
-                potential_targets.append(pos)
-    
-    return potential_targets
+# Adjacent positions of every cell, computed once for the fixed 10x10 board
+NEIGHBORS = []
+for pos in range(100):
+    row, col = divmod(pos, 10)
+    NEIGHBORS.append(
+        tuple(
+            new_row * 10 + new_col
+            for new_row, new_col in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1))
+            if 0 <= new_row < 10 and 0 <= new_col < 10
+        )
+    )
+
+def generate_hunt_targets(hit_position, ai_shots_set):
+    return [pos for pos in NEIGHBORS[hit_position] if pos not in ai_shots_set]
 
 ai_shot = -1
 if ai_hits:
     # Hunt mode - target adjacent to last hit
-    hunt_targets = generate_hunt_targets(ai_hits[-1], ai_shots)
+    hunt_targets = generate_hunt_targets(ai_hits[-1], ai_shots_set)
     if hunt_targets:
         ai_shot = hunt_targets[0]
 
 if ai_shot == -1:
     # Random search if no targets
-    available_positions = [i for i in range(100) if i not in ai_shots]
+    available_positions = [i for i in range(100) if i not in ai_shots_set]
     if available_positions:
         ai_shot = available_positions[0]
 
@@ -518,27 +511,28 @@ ai_shots = metadata.get("ai_shots", [])
 user_hits = metadata.get("user_hits", [])
 ai_hits = metadata.get("ai_hits", [])
 
+user_shots_set = set(user_shots)
+ai_shots_set = set(ai_shots)
+
 validation_errors = []
 
 # Check that all hits are also shots
-for hit in user_hits:
-    if hit not in user_shots:
-        validation_errors.append(f"User hit {hit} not in shots")
+for hit in sorted(set(user_hits) - user_shots_set):
+    validation_errors.append(f"User hit {hit} not in shots")
 
-for hit in ai_hits:
-    if hit not in ai_shots:
-        validation_errors.append(f"AI hit {hit} not in shots")
+for hit in sorted(set(ai_hits) - ai_shots_set):
+    validation_errors.append(f"AI hit {hit} not in shots")
 
 # Check shot bounds
-for shot in user_shots + ai_shots:
+for shot in sorted(user_shots_set | ai_shots_set):
     if shot < 0 or shot > 99:
         validation_errors.append(f"Shot {shot} out of bounds")
 
 # Check for duplicate shots
-if len(set(user_shots)) != len(user_shots):
+if len(user_shots_set) != len(user_shots):
     validation_errors.append("Duplicate user shots")
 
-if len(set(ai_shots)) != len(ai_shots):
+if len(ai_shots_set) != len(ai_shots):
     validation_errors.append("Duplicate AI shots")
 
 script_result = {
@@ -583,35 +577,40 @@ class TestBattleshipEdgeCases(unittest.TestCase):
         """Test handling of invalid shots"""
         invalid_shots = [-1, 100, 999, "invalid", None]
 
-        for invalid_shot in invalid_shots:
-            validation_script = f"""
-user_shot_input = {repr(invalid_shot)}
+        # Validate every input in one script run rather than one run per shot
+        validation_script = """
+is_valid_shot = []
+for user_shot_input in metadata.get("user_shot_inputs", []):
+    try:
+        user_shot = int(user_shot_input)
+        is_valid = 0 <= user_shot <= 99
+    except (ValueError, TypeError):
+        is_valid = False
+    is_valid_shot.append(is_valid)
 
-try:
-    user_shot = int(user_shot_input)
-    is_valid = 0 <= user_shot <= 99
-except (ValueError, TypeError):
-    is_valid = False
-    user_shot = -1
-
-script_result = {{
-    "metadata": {{
-        "user_shot": user_shot,
-        "is_valid_shot": is_valid
-    }}
-}}
+script_result = {
+    "metadata": {
+        "is_valid_shot": is_valid_shot
+    }
+}
 """
 
-            result = activity.execute_processing_script({}, validation_script)
-            self.assertFalse(result["metadata"]["is_valid_shot"])
+        result = activity.execute_processing_script(
+            {"user_shot_inputs": invalid_shots}, validation_script
+        )
+        for invalid_shot, is_valid in zip(
+            invalid_shots, result["metadata"]["is_valid_shot"], strict=True
+        ):
+            self.assertFalse(is_valid, f"{invalid_shot!r} should be rejected")
 
     def test_duplicate_shot_handling(self):
         """Test handling of duplicate shots"""
         duplicate_shot_script = """
 user_shot = 42
 user_shots = metadata.get("user_shots", [])
+user_shots_set = set(user_shots)
 
-is_duplicate = user_shot in user_shots
+is_duplicate = user_shot in user_shots_set
 if not is_duplicate:
     user_shots.append(user_shot)
 
@@ -640,19 +639,29 @@ script_result = {
         """Test edge cases in game ending"""
         # Test simultaneous win condition (both players hit all ships in same turn)
         simultaneous_win_script = """
-user_board = [-1] * 100
-ai_board = [-1] * 100
+import array
+
+# These boards never leave the script, so cells hold ship ids (indexes into
+# SHIP_NAMES) packed one byte each instead of name strings
+SHIP_NAMES = ["Carrier", "Battleship", "Cruiser", "Submarine", "Destroyer"]
+DESTROYER = SHIP_NAMES.index("Destroyer")
+
+user_board = array.array("b", [-1] * 100)
+ai_board = array.array("b", [-1] * 100)
 
 # Place single ship for each player  
-user_board[0] = "Destroyer"
-ai_board[0] = "Destroyer"
+user_board[0] = DESTROYER
+ai_board[0] = DESTROYER
 
 user_hits = [0]  # User hits all AI ships
 ai_hits = [0]    # AI hits all user ships
 
+user_hits_set = frozenset(user_hits)
+ai_hits_set = frozenset(ai_hits)
+
 # Both would win simultaneously
-all_ai_ships_hit = all(ai_board[i] == -1 or i in user_hits for i in range(100))
-all_user_ships_hit = all(user_board[i] == -1 or i in ai_hits for i in range(100))
+all_ai_ships_hit = all(ai_board[i] == -1 or i in user_hits_set for i in range(100))
+all_user_ships_hit = all(user_board[i] == -1 or i in ai_hits_set for i in range(100))
 
 # User wins takes precedence (user moves first)
 game_over = all_ai_ships_hit or all_user_ships_hit
@@ -670,26 +679,15 @@ script_result = {
 }
 """
 
-        mock_result = {
-            "metadata": {
-                "game_over": True,
-                "user_wins": True,
-                "ai_wins": False,
-                "all_ai_ships_hit": True,
-                "all_user_ships_hit": True,
-            }
-        }
-
-        with patch.object(
-            activity, "execute_processing_script", return_value=mock_result
-        ) as mock_exec:
-            result = activity.execute_processing_script({}, simultaneous_win_script)
+        result = activity.execute_processing_script({}, simultaneous_win_script)
 
-            self.assertTrue(result["metadata"]["game_over"])
-            self.assertTrue(result["metadata"]["user_wins"])
-            self.assertFalse(result["metadata"]["ai_wins"])
+        self.assertTrue(result["metadata"]["game_over"])
+        self.assertTrue(result["metadata"]["user_wins"])
+        self.assertFalse(result["metadata"]["ai_wins"])
 
-            mock_exec.assert_called_once()
+        # Both sides had sunk everything; the user still takes the win
+        self.assertTrue(result["metadata"]["all_ai_ships_hit"])
+        self.assertTrue(result["metadata"]["all_user_ships_hit"])
 
 
 if __name__ == "__main__":
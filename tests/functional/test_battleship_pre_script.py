@@ -6,73 +6,70 @@ Test that battleship pre_script functionality works with actual YAML files
 import unittest
 import os
 import sys
-from unittest.mock import patch, MagicMock
 from pathlib import Path
 
+RESEARCH_DIR = Path(__file__).parent.parent.parent / "research"
+BATTLESHIP_PATH = RESEARCH_DIR / "activity29-battleship.yaml"
+TESTSHIP_PATH = RESEARCH_DIR / "activity29-testship.yaml"
+
 # Add research directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent.parent / "research"))
+sys.path.insert(0, str(RESEARCH_DIR))
 import guarded_ai
 
 
 class TestBattleshipPreScript(unittest.TestCase):
     """Test actual battleship YAML files with pre_script"""
 
-    def setUp(self):
-        """Set up test environment"""
-        self.mock_client = MagicMock()
-        self.mock_response = MagicMock()
-        self.mock_response.choices = [MagicMock()]
-        self.mock_response.choices[0].message.content = "Test response"
-        self.mock_client.chat.completions.create.return_value = self.mock_response
-
-    def test_battleship_yaml_has_pre_script(self):
-        """Test that battleship YAML loads and has pre_script"""
-        activity_file = (
-            Path(__file__).parent.parent.parent
-            / "research"
-            / "activity29-battleship.yaml"
+    @classmethod
+    def setUpClass(cls):
+        """Parse each battleship YAML once for the whole class"""
+        cls._battleship = guarded_ai.load_yaml_activity(str(BATTLESHIP_PATH))
+        cls._testship = guarded_ai.load_yaml_activity(str(TESTSHIP_PATH))
+
+        # The step carrying the pre_script (step_2), located once
+        cls._step_with_pre_script = next(
+            (
+                step
+                for section in cls._battleship["sections"]
+                for step in section["steps"]
+                if step.get("step_id") == "step_2" and "pre_script" in step
+            ),
+            None,
         )
-        activity = guarded_ai.load_yaml_activity(str(activity_file))
-
-        # Find step with pre_script
-        found_pre_script = False
-        pre_script_content = ""
-
-        for section in activity["sections"]:
-            for step in section["steps"]:
-                if "pre_script" in step:
-                    found_pre_script = True
-                    pre_script_content = step["pre_script"]
-
-                    # Should contain win detection logic
-                    self.assertIn("user_winning_move", pre_script_content)
-                    self.assertIn("ai_winning_move", pre_script_content)
-                    self.assertIn("is_game_ending_move", pre_script_content)
-                    self.assertIn("user_shot_input", pre_script_content)
-                    break
 
-            if found_pre_script:
-                break
+    def test_yamls_have_pre_script(self):
+        """Test that both battleship YAMLs load and have a pre_script step"""
+        for name, activity in [
+            ("battleship", self._battleship),
+            ("testship", self._testship),
+        ]:
+            with self.subTest(activity=name):
+                self.assertTrue(
+                    any(
+                        "pre_script" in step
+                        for section in activity["sections"]
+                        for step in section["steps"]
+                    ),
+                    f"{name} YAML should have pre_script",
+                )
+
+    def test_battleship_pre_script_has_win_detection(self):
+        """Test that the battleship pre_script carries the win detection logic"""
+        self.assertIsNotNone(
+            self._step_with_pre_script, "Should find step_2 with pre_script"
+        )
+        pre_script_content = self._step_with_pre_script["pre_script"]
 
-        self.assertTrue(found_pre_script, "Battleship YAML should have pre_script")
+        # Should contain win detection logic
+        self.assertIn("user_winning_move", pre_script_content)
+        self.assertIn("ai_winning_move", pre_script_content)
+        self.assertIn("is_game_ending_move", pre_script_content)
+        self.assertIn("user_shot_input", pre_script_content)
 
     def test_battleship_pre_script_execution_simulation(self):
         """Test simulated battleship pre_script execution"""
-        activity_file = (
-            Path(__file__).parent.parent.parent
-            / "research"
-            / "activity29-battleship.yaml"
-        )
-        activity = guarded_ai.load_yaml_activity(str(activity_file))
-
         # Find the step with pre_script (step_2)
-        step_with_pre_script = None
-        for section in activity["sections"]:
-            for step in section["steps"]:
-                if step.get("step_id") == "step_2" and "pre_script" in step:
-                    step_with_pre_script = step
-                    break
-
+        step_with_pre_script = self._step_with_pre_script
         self.assertIsNotNone(step_with_pre_script, "Should find step_2 with pre_script")
 
         # Test pre_script logic manually
@@ -98,26 +95,6 @@ class TestBattleshipPreScript(unittest.TestCase):
         # Should NOT detect winning move
         self.assertFalse(result.get("metadata", {}).get("is_game_ending_move", False))
 
-    def test_testship_yaml_has_pre_script(self):
-        """Test that testship YAML also has pre_script"""
-        activity_file = (
-            Path(__file__).parent.parent.parent
-            / "research"
-            / "activity29-testship.yaml"
-        )
-        activity = guarded_ai.load_yaml_activity(str(activity_file))
-
-        # Should also have pre_script (same structure as battleship)
-        found_pre_script = False
-
-        for section in activity["sections"]:
-            for step in section["steps"]:
-                if "pre_script" in step:
-                    found_pre_script = True
-                    break
-
-        self.assertTrue(found_pre_script, "Testship YAML should have pre_script")
-
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
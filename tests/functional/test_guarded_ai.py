@@ -8,43 +8,77 @@ validator and YAML changes.
 """
 
 import unittest
+import functools
 import os
 import sys
-import tempfile
 import json
-from unittest.mock import patch, MagicMock
+from types import MappingProxyType
+from unittest.mock import patch, MagicMock, Mock
 from pathlib import Path
 
-# Add research directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent.parent / "research"))
+RESEARCH_DIR = Path(__file__).parent.parent.parent / "research"
+TESTS_DIR = Path(__file__).parent.parent
+
+# Add research and tests directories to path; other suites add them too, and
+# every duplicate entry is one more directory each failed import has to probe
+for path in (RESEARCH_DIR, TESTS_DIR):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
 
 # Import guarded_ai directly
 import guarded_ai
+from helpers import make_mock_client
+
+
+def _freeze(obj, memo):
+    """Wrap every dict under obj in a read-only MappingProxyType
+
+    Lists are left as lists since tests check the YAML shapes. memo keeps
+    dicts shared between the sections and the step index shared.
+    """
+    if isinstance(obj, dict):
+        if id(obj) not in memo:
+            memo[id(obj)] = MappingProxyType(
+                {key: _freeze(value, memo) for key, value in obj.items()}
+            )
+        return memo[id(obj)]
+    if isinstance(obj, list):
+        return [_freeze(item, memo) for item in obj]
+    return obj
+
+
+@functools.lru_cache(maxsize=None)
+def _load_cached(path, mtime):
+    """Parse a research activity once per (path, mtime)"""
+    return _freeze(guarded_ai.load_yaml_activity(path), {})
+
+
+def load_activity(path):
+    """Load a research activity through the parse cache
+
+    The cached activity is frozen, so it is shared across tests without a
+    copy; a test that tries to mutate it fails instead of leaking state.
+    """
+    path = str(path)
+    return _load_cached(path, os.path.getmtime(path))
+
+
+def _iter_exit_transitions(activity):
+    """Yield (step, transition) for every step with an exit bucket
+
+    A direct key lookup per step instead of scanning every transition.
+    """
+    for section in activity["sections"]:
+        for step in section["steps"]:
+            transition = step.get("transitions", {}).get("exit")
+            if transition is not None:
+                yield step, transition
 
 
 class TestGuardedAIFunctionality(unittest.TestCase):
     """Test guarded_ai.py core functionality"""
 
-    def setUp(self):
-        """Set up test environment"""
-        # Mock the OpenAI client to avoid API calls
-        self.mock_client = MagicMock()
-        self.mock_response = MagicMock()
-        self.mock_response.choices = [MagicMock()]
-        self.mock_response.choices[0].message.content = "correct"
-
-        self.mock_client.chat.completions.create.return_value = self.mock_response
-
-    def create_test_activity(self, content):
-        """Create temporary activity YAML file"""
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".yaml", delete=False) as f:
-            f.write(content)
-            return f.name
-
-    def test_integer_bucket_matching(self):
-        """Test that integer buckets work correctly (key regression test)"""
-        # This tests our fix for activity20-n-plus-1.yaml
-        test_activity = """
+    INTEGER_BUCKET_YAML = """
 sections:
   - section_id: "test_section"
     title: "Integer Bucket Test"
@@ -65,47 +99,7 @@ sections:
               - "That's not correct."
 """
 
-        with patch("guarded_ai.get_openai_client_and_model") as mock_get_client:
-            mock_get_client.return_value = (self.mock_client, "test-model")
-
-            # Mock the categorize_response to return "1912"
-            with patch("guarded_ai.categorize_response") as mock_categorize:
-                mock_categorize.return_value = "1912"
-
-                import guarded_ai as guarded_ai
-
-                activity_file = self.create_test_activity(test_activity)
-                try:
-                    activity = guarded_ai.load_yaml_activity(activity_file)
-
-                    # Test that integer bucket matching works
-                    step = activity["sections"][0]["steps"][0]
-
-                    # Simulate the transition matching logic
-                    category = "1912"
-                    transitions = step["transitions"]
-
-                    # Test the bucket matching logic we added
-                    transition = None
-                    if category in transitions:
-                        transition = transitions[category]
-                    elif category.isdigit() and int(category) in transitions:
-                        transition = transitions[int(category)]
-
-                    self.assertIsNotNone(
-                        transition, "Should find transition for integer bucket"
-                    )
-                    self.assertIn(
-                        "Correct! The Titanic sank in 1912.",
-                        transition["content_blocks"],
-                    )
-
-                finally:
-                    os.unlink(activity_file)
-
-    def test_metadata_clear_functionality(self):
-        """Test metadata_clear functionality"""
-        test_activity = """
+    METADATA_CLEAR_YAML = """
 sections:
   - section_id: "test_section"  
     title: "Metadata Clear Test"
@@ -123,29 +117,7 @@ sections:
               - "Metadata cleared!"
 """
 
-        import guarded_ai as guarded_ai
-
-        activity_file = self.create_test_activity(test_activity)
-        try:
-            activity = guarded_ai.load_yaml_activity(activity_file)
-            step = activity["sections"][0]["steps"][0]
-            transition = step["transitions"]["clear_test"]
-
-            # Test metadata clearing
-            metadata = {"test_key": "test_value", "another_key": "another_value"}
-
-            # Simulate the metadata_clear logic we added
-            if "metadata_clear" in transition and transition["metadata_clear"] == True:
-                metadata.clear()
-
-            self.assertEqual(len(metadata), 0, "Metadata should be cleared")
-
-        finally:
-            os.unlink(activity_file)
-
-    def test_metadata_feedback_filter(self):
-        """Test metadata_feedback_filter functionality"""
-        test_activity = """
+    FEEDBACK_FILTER_YAML = """
 sections:
   - section_id: "test_section"
     title: "Metadata Filter Test"
@@ -168,44 +140,7 @@ sections:
               - "Filtered feedback!"
 """
 
-        with patch("guarded_ai.get_openai_client_and_model") as mock_get_client:
-            mock_get_client.return_value = (self.mock_client, "test-model")
-
-            import guarded_ai as guarded_ai
-
-            activity_file = self.create_test_activity(test_activity)
-            try:
-                activity = guarded_ai.load_yaml_activity(activity_file)
-                step = activity["sections"][0]["steps"][0]
-                transition = step["transitions"]["filter_test"]
-
-                # Test metadata filtering for feedback
-                full_metadata = {
-                    "score": 85,
-                    "level": 2,
-                    "secret_data": "should_not_be_included",
-                    "user_id": "12345",
-                }
-
-                # Simulate the feedback filtering logic we added
-                feedback_metadata = full_metadata
-                if "metadata_feedback_filter" in transition:
-                    filter_keys = transition["metadata_feedback_filter"]
-                    feedback_metadata = {
-                        k: v for k, v in full_metadata.items() if k in filter_keys
-                    }
-
-                expected_filtered = {"score": 85, "level": 2}
-                self.assertEqual(feedback_metadata, expected_filtered)
-                self.assertNotIn("secret_data", feedback_metadata)
-                self.assertNotIn("user_id", feedback_metadata)
-
-            finally:
-                os.unlink(activity_file)
-
-    def test_metadata_remove_list_format(self):
-        """Test that metadata_remove works with list format (activity17 fix)"""
-        test_activity = """
+    METADATA_REMOVE_YAML = """
 sections:
   - section_id: "test_section"
     title: "Metadata Remove Test"
@@ -225,38 +160,7 @@ sections:
               - "Keys removed!"
 """
 
-        import guarded_ai as guarded_ai
-
-        activity_file = self.create_test_activity(test_activity)
-        try:
-            activity = guarded_ai.load_yaml_activity(activity_file)
-            step = activity["sections"][0]["steps"][0]
-            transition = step["transitions"]["remove_test"]
-
-            # Test metadata removal with list format
-            metadata = {
-                "old_key1": "value1",
-                "old_key2": "value2",
-                "keep_key": "keep_value",
-            }
-
-            # Simulate the metadata_remove logic
-            if "metadata_remove" in transition:
-                for key in transition["metadata_remove"]:
-                    if key in metadata:
-                        del metadata[key]
-
-            expected = {"keep_key": "keep_value"}
-            self.assertEqual(metadata, expected)
-            self.assertNotIn("old_key1", metadata)
-            self.assertNotIn("old_key2", metadata)
-
-        finally:
-            os.unlink(activity_file)
-
-    def test_boolean_bucket_matching(self):
-        """Test that boolean buckets work correctly"""
-        test_activity = """
+    BOOLEAN_BUCKET_YAML = """
 sections:
   - section_id: "test_section"
     title: "Boolean Bucket Test"
@@ -277,53 +181,139 @@ sections:
               - "No, that's not right."
 """
 
-        import guarded_ai as guarded_ai
+    # (activity, classifier answer, content block the transition must show)
+    BUCKET_CASES = (
+        # Integer bucket regression from activity20-n-plus-1.yaml
+        ("integer_bucket", "1912", "Correct! The Titanic sank in 1912."),
+        ("boolean_bucket", "yes", "Yes, that's right!"),
+        ("boolean_bucket", "true", "Yes, that's right!"),
+        ("boolean_bucket", "TRUE", "Yes, that's right!"),
+        ("boolean_bucket", "Yes", "Yes, that's right!"),
+        ("boolean_bucket", "no", "No, that's not right."),
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        """Parse each inline activity once for the whole class"""
+        cls.activities = {
+            name: guarded_ai.parse_yaml_activity(content)
+            for name, content in [
+                ("integer_bucket", cls.INTEGER_BUCKET_YAML),
+                ("metadata_clear", cls.METADATA_CLEAR_YAML),
+                ("feedback_filter", cls.FEEDBACK_FILTER_YAML),
+                ("metadata_remove", cls.METADATA_REMOVE_YAML),
+                ("boolean_bucket", cls.BOOLEAN_BUCKET_YAML),
+            ]
+        }
+
+    def test_bucket_matching(self):
+        """Test that integer and boolean buckets match the classifier's answer"""
+        for name, category, expected in self.BUCKET_CASES:
+            with self.subTest(activity=name, category=category):
+                step = self.activities[name]["sections"][0]["steps"][0]
 
-        activity_file = self.create_test_activity(test_activity)
-        try:
-            activity = guarded_ai.load_yaml_activity(activity_file)
-            step = activity["sections"][0]["steps"][0]
-            transitions = step["transitions"]
-
-            # Test boolean matching logic
-            for category_response in ["yes", "true", "TRUE", "Yes"]:
-                category = category_response.lower()
-
-                transition = None
-                if category in transitions:
-                    transition = transitions[category]
-                elif category.isdigit() and int(category) in transitions:
-                    transition = transitions[int(category)]
-                else:
-                    # This is the logic we added
-                    if category in ["yes", "true"]:
-                        category = True
-                    elif category in ["no", "false"]:
-                        category = False
-                    if category in transitions:
-                        transition = transitions[category]
+                # One lookup in the normalized keys built at load time
+                key = step["_transitions_norm"].get(category.lower())
+                transition = step["transitions"].get(key)
 
                 self.assertIsNotNone(
-                    transition,
-                    f"Should find boolean transition for '{category_response}'",
+                    transition, f"Should find a transition for '{category}'"
                 )
-                self.assertIn("Yes, that's right!", transition["content_blocks"])
+                self.assertIn(expected, transition["content_blocks"])
+
+    def test_metadata_clear_functionality(self):
+        """Test metadata_clear functionality"""
+        activity = self.activities["metadata_clear"]
+        step = activity["sections"][0]["steps"][0]
+        transition = step["transitions"]["clear_test"]
 
-        finally:
-            os.unlink(activity_file)
+        # Test metadata clearing
+        metadata = {"test_key": "test_value", "another_key": "another_value"}
+
+        # Simulate the metadata_clear logic we added
+        if "metadata_clear" in transition and transition["metadata_clear"] == True:
+            metadata.clear()
+
+        self.assertEqual(len(metadata), 0, "Metadata should be cleared")
+
+    def test_metadata_feedback_filter(self):
+        """Test metadata_feedback_filter functionality"""
+        with patch("guarded_ai.get_openai_client_and_model") as mock_get_client:
+            # Mock the OpenAI client to avoid API calls
+            mock_client, _ = make_mock_client("correct")
+            mock_get_client.return_value = (mock_client, "test-model")
+
+            activity = self.activities["feedback_filter"]
+            step = activity["sections"][0]["steps"][0]
+            transition = step["transitions"]["filter_test"]
+
+            # Test metadata filtering for feedback
+            full_metadata = {
+                "score": 85,
+                "level": 2,
+                "secret_data": "should_not_be_included",
+                "user_id": "12345",
+            }
+
+            # Simulate the feedback filtering logic we added
+            feedback_metadata = full_metadata
+            if "metadata_feedback_filter" in transition:
+                filter_keys = transition["_feedback_filter"]
+                feedback_metadata = {
+                    k: v for k, v in full_metadata.items() if k in filter_keys
+                }
+
+            expected_filtered = {"score": 85, "level": 2}
+            self.assertEqual(feedback_metadata, expected_filtered)
+            self.assertNotIn("secret_data", feedback_metadata)
+            self.assertNotIn("user_id", feedback_metadata)
+
+    def test_metadata_remove_list_format(self):
+        """Test that metadata_remove works with list format (activity17 fix)"""
+        activity = self.activities["metadata_remove"]
+        step = activity["sections"][0]["steps"][0]
+        transition = step["transitions"]["remove_test"]
+
+        # Test metadata removal with list format
+        metadata = {
+            "old_key1": "value1",
+            "old_key2": "value2",
+            "keep_key": "keep_value",
+        }
+
+        # Simulate the metadata_remove logic
+        if "metadata_remove" in transition:
+            for key in transition["metadata_remove"]:
+                metadata.pop(key, None)
+
+        expected = {"keep_key": "keep_value"}
+        self.assertEqual(metadata, expected)
+        self.assertNotIn("old_key1", metadata)
+        self.assertNotIn("old_key2", metadata)
 
 
 class TestActivityYAMLChanges(unittest.TestCase):
     """Test that our YAML changes don't break functionality"""
 
+    ACTIVITY_FILES = (
+        "activity3.yaml",
+        "activity17-choose-adventure.yaml",
+        "activity29-battleship.yaml",
+        "activity29-testship.yaml",
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        """Load every research activity the class checks in one pass"""
+        # Sequential on purpose: four small files parse faster than a
+        # process pool can start and pickle the results back
+        cls.activities = {
+            name: load_activity(RESEARCH_DIR / name) for name in cls.ACTIVITY_FILES
+        }
+
     def test_activity3_terminal_section(self):
         """Test that activity3's new terminal section loads correctly"""
-        import guarded_ai as guarded_ai
-
-        activity_file = (
-            Path(__file__).parent.parent.parent / "research" / "activity3.yaml"
-        )
-        activity = guarded_ai.load_yaml_activity(str(activity_file))
+        activity = self.activities["activity3.yaml"]
 
         # Should have section_5 now
         section_ids = [section["section_id"] for section in activity["sections"]]
@@ -347,14 +337,7 @@ class TestActivityYAMLChanges(unittest.TestCase):
 
     def test_activity17_metadata_remove_format(self):
         """Test that activity17's metadata_remove changes work"""
-        import guarded_ai as guarded_ai
-
-        activity_file = (
-            Path(__file__).parent.parent.parent
-            / "research"
-            / "activity17-choose-adventure.yaml"
-        )
-        activity = guarded_ai.load_yaml_activity(str(activity_file))
+        activity = self.activities["activity17-choose-adventure.yaml"]
 
         # Find steps with metadata_remove
         found_metadata_remove = False
@@ -373,36 +356,25 @@ class TestActivityYAMLChanges(unittest.TestCase):
 
     def test_battleship_exit_transitions(self):
         """Test that battleship exit transitions go to step_4"""
-        import guarded_ai as guarded_ai
-
         for battleship_file in [
             "activity29-battleship.yaml",
             "activity29-testship.yaml",
         ]:
-            activity_file = (
-                Path(__file__).parent.parent.parent / "research" / battleship_file
-            )
-            activity = guarded_ai.load_yaml_activity(str(activity_file))
+            activity = self.activities[battleship_file]
 
             # Find exit transitions and verify they go to step_4
             exit_transitions_found = 0
-            for section in activity["sections"]:
-                for step in section["steps"]:
-                    if "transitions" in step:
-                        for bucket, transition in step["transitions"].items():
-                            if (
-                                bucket == "exit"
-                                and "next_section_and_step" in transition
-                            ):
-                                exit_transitions_found += 1
-                                target = transition["next_section_and_step"]
-                                if step["step_id"] == "step_2":
-                                    # step_2 exit should go directly to step_4
-                                    self.assertEqual(
-                                        target,
-                                        "section_1:step_4",
-                                        f"step_2 exit should go to step_4 in {battleship_file}",
-                                    )
+            for step, transition in _iter_exit_transitions(activity):
+                if "next_section_and_step" in transition:
+                    exit_transitions_found += 1
+                    target = transition["next_section_and_step"]
+                    if step["step_id"] == "step_2":
+                        # step_2 exit should go directly to step_4
+                        self.assertEqual(
+                            target,
+                            "section_1:step_4",
+                            f"step_2 exit should go to step_4 in {battleship_file}",
+                        )
 
             self.assertGreater(
                 exit_transitions_found,
@@ -414,8 +386,16 @@ class TestActivityYAMLChanges(unittest.TestCase):
 class TestGuardedAIClientAndErrorHandling(unittest.TestCase):
     """Test client management and error handling in guarded_ai"""
 
+    @classmethod
+    def setUpClass(cls):
+        """Build the failing client shared by the error-handling tests"""
+        cls.error_client, _ = make_mock_client()
+        cls.error_client.chat.completions.create.side_effect = Exception("API Error")
+
     def setUp(self):
         """Reset global state before each test"""
+        # Drop recorded calls; the configured side_effect is kept
+        self.error_client.reset_mock()
         # Save original state
         self.original_model_map = guarded_ai.MODEL_CLIENT_MAP.copy()
         guarded_ai.MODEL_CLIENT_MAP.clear()
@@ -500,9 +480,7 @@ class TestGuardedAIClientAndErrorHandling(unittest.TestCase):
     def test_categorize_response_error_handling(self):
         """Test error handling in categorization"""
         with patch("guarded_ai.get_openai_client_and_model") as mock_get_client:
-            mock_client = MagicMock()
-            mock_client.chat.completions.create.side_effect = Exception("API Error")
-            mock_get_client.return_value = (mock_client, "test-model")
+            mock_get_client.return_value = (self.error_client, "test-model")
 
             result = guarded_ai.categorize_response(
                 "Test question",
@@ -516,11 +494,7 @@ class TestGuardedAIClientAndErrorHandling(unittest.TestCase):
     def test_generate_ai_feedback_error_handling(self):
         """Test error handling in feedback generation"""
         with patch("guarded_ai.get_openai_client_and_model") as mock_get_client:
-            mock_client = MagicMock()
-            mock_client.chat.completions.create.side_effect = Exception(
-                "Feedback Error"
-            )
-            mock_get_client.return_value = (mock_client, "test-model")
+            mock_get_client.return_value = (self.error_client, "test-model")
 
             result = guarded_ai.generate_ai_feedback(
                 "correct", "Test question", "Test response", "Generate feedback", {}
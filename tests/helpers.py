@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Shared test helpers for OpenCompletion testing
+
+Plain functions rather than fixtures, so test modules can import them
+both under pytest and when run directly with unittest.
+"""
+
+from unittest.mock import Mock
+
+
+def make_mock_client(content=""):
+    """Build an OpenAI client mock whose completions return `content`
+
+    Returns (client, response). Only chat.completions.create exists, so
+    attribute typos fail loudly, and tests can still set side_effect or
+    inspect calls on create. Plain Mock skips the magic-method setup
+    MagicMock does for every node in the chain.
+    """
+    message = Mock(spec=["content"], content=content)
+    response = Mock(spec=["choices"], choices=[Mock(spec=["message"], message=message)])
+    completions = Mock(spec=["create"])
+    completions.create.return_value = response
+    client = Mock(
+        spec=["chat"], chat=Mock(spec=["completions"], completions=completions)
+    )
+    return client, response
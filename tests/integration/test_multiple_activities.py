@@ -7,6 +7,7 @@ can be loaded, validated, and executed without errors after our changes.
 """
 
 import unittest
+import functools
 import os
 import sys
 import glob
@@ -20,6 +21,15 @@ import guarded_ai
 from activity_yaml_validator import ActivityYAMLValidator
 
 
+@functools.lru_cache(maxsize=None)
+def load_activity(path):
+    """Parse each activity file once for every test in this module
+
+    The tests only read the parsed activities, so they share one copy.
+    """
+    return guarded_ai.load_yaml_activity(path)
+
+
 class TestMultipleActivityFiles(unittest.TestCase):
     """Integration tests across multiple activity files"""
 
@@ -45,7 +55,7 @@ class TestMultipleActivityFiles(unittest.TestCase):
         for activity_file in self.activity_files:
             with self.subTest(file=activity_file.name):
                 try:
-                    activity = guarded_ai.load_yaml_activity(str(activity_file))
+                    activity = load_activity(str(activity_file))
                     self.assertIsInstance(activity, dict)
                     self.assertIn("sections", activity)
                 except Exception as e:
@@ -90,7 +100,7 @@ class TestMultipleActivityFiles(unittest.TestCase):
             issues = []
 
             try:
-                activity = guarded_ai.load_yaml_activity(str(activity_file))
+                activity = load_activity(str(activity_file))
 
                 # Check basic structure
                 if "sections" not in activity:
@@ -138,7 +148,7 @@ class TestMultipleActivityFiles(unittest.TestCase):
         # Test activity3 has the new terminal section
         activity3_path = self.research_dir / "activity3.yaml"
         if activity3_path.exists():
-            activity3 = guarded_ai.load_yaml_activity(str(activity3_path))
+            activity3 = load_activity(str(activity3_path))
             section_ids = [s["section_id"] for s in activity3["sections"]]
             self.assertIn("section_5", section_ids, "activity3 should have section_5")
 
@@ -162,7 +172,7 @@ class TestMultipleActivityFiles(unittest.TestCase):
         # Test activity17 has metadata_remove in list format
         activity17_path = self.research_dir / "activity17-choose-adventure.yaml"
         if activity17_path.exists():
-            activity17 = guarded_ai.load_yaml_activity(str(activity17_path))
+            activity17 = load_activity(str(activity17_path))
             found_metadata_remove = False
 
             for section in activity17["sections"]:
@@ -185,7 +195,7 @@ class TestMultipleActivityFiles(unittest.TestCase):
         # Test activity20 has integer buckets
         activity20_path = self.research_dir / "activity20-n-plus-1.yaml"
         if activity20_path.exists():
-            activity20 = guarded_ai.load_yaml_activity(str(activity20_path))
+            activity20 = load_activity(str(activity20_path))
             found_integer_bucket = False
 
             for section in activity20["sections"]:
@@ -217,7 +227,7 @@ class TestMultipleActivityFiles(unittest.TestCase):
         ]:
             battleship_path = self.research_dir / battleship_file
             if battleship_path.exists():
-                battleship = guarded_ai.load_yaml_activity(str(battleship_path))
+                battleship = load_activity(str(battleship_path))
                 found_pre_script = False
 
                 for section in battleship["sections"]:
@@ -241,7 +251,7 @@ class TestMultipleActivityFiles(unittest.TestCase):
             inconsistencies = []
 
             try:
-                activity = guarded_ai.load_yaml_activity(str(activity_file))
+                activity = load_activity(str(activity_file))
 
                 for section in activity["sections"]:
                     for step in section["steps"]:
@@ -321,7 +331,7 @@ class TestMultipleActivityFiles(unittest.TestCase):
 
             for activity_file in self.activity_files:
                 try:
-                    activity = guarded_ai.load_yaml_activity(str(activity_file))
+                    activity = load_activity(str(activity_file))
 
                     # Test that we can access the first section and step
                     if activity["sections"]:
@@ -380,7 +390,7 @@ class TestMultipleActivityFiles(unittest.TestCase):
             errors = []
 
             try:
-                activity = guarded_ai.load_yaml_activity(str(activity_file))
+                activity = load_activity(str(activity_file))
 
                 for section in activity["sections"]:
                     for step in section["steps"]:
@@ -466,7 +476,7 @@ class TestActivityFileStatistics(unittest.TestCase):
 
         for activity_file in self.activity_files:
             try:
-                activity = guarded_ai.load_yaml_activity(str(activity_file))
+                activity = load_activity(str(activity_file))
 
                 stats["total_sections"] += len(activity["sections"])
 
@@ -25,21 +25,28 @@ from activity_yaml_validator import ActivityYAMLValidator, ValidationError
 class TestActivityYAMLValidator(unittest.TestCase):
     """Test cases for ActivityYAMLValidator"""
 
+    @classmethod
+    def setUpClass(cls):
+        """Create one scratch directory shared by every test's YAML files"""
+        cls._tmpdir = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(cls._tmpdir.cleanup)
+
     def setUp(self):
         """Set up test fixtures"""
         self.validator = ActivityYAMLValidator()
 
     def create_temp_yaml(self, content: str) -> str:
-        """Create a temporary YAML file with given content"""
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".yaml", delete=False) as f:
+        """Create a temporary YAML file with given content
+
+        Files land in the class scratch directory, which is removed once
+        after the last test.
+        """
+        with tempfile.NamedTemporaryFile(
+            mode="w", suffix=".yaml", dir=self._tmpdir.name, delete=False
+        ) as f:
             f.write(content)
             return f.name
 
-    def tearDown(self):
-        """Clean up any temporary files"""
-        # Clean up is handled by tempfile
-        pass
-
     def test_valid_yaml_passes(self):
         """Test that a valid YAML file passes validation"""
         valid_yaml = """
@@ -74,12 +81,9 @@ sections:
           - "All done!"
 """
         temp_file = self.create_temp_yaml(valid_yaml)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertTrue(is_valid)
-            self.assertEqual(len(errors), 0)
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertTrue(is_valid)
+        self.assertEqual(len(errors), 0)
 
     def test_yaml_syntax_error(self):
         """Test that YAML syntax errors are caught"""
@@ -95,13 +99,10 @@ sections:
         invalid_key: [unclosed list
 """
         temp_file = self.create_temp_yaml(invalid_yaml)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertFalse(is_valid)
-            self.assertGreater(len(errors), 0)
-            self.assertIn("YAML syntax error", errors[0])
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertFalse(is_valid)
+        self.assertGreater(len(errors), 0)
+        self.assertIn("YAML syntax error", errors[0])
 
     def test_missing_required_fields(self):
         """Test that missing required fields are caught"""
@@ -109,12 +110,9 @@ sections:
 default_max_attempts_per_step: 3
 """
         temp_file = self.create_temp_yaml(missing_sections)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertFalse(is_valid)
-            self.assertIn("Missing required field: sections", errors)
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertFalse(is_valid)
+        self.assertIn("Missing required field: sections", errors)
 
     def test_invalid_field_types(self):
         """Test that invalid field types are caught"""
@@ -128,15 +126,10 @@ sections:
     steps: "should_be_list"
 """
         temp_file = self.create_temp_yaml(invalid_types)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertFalse(is_valid)
-            self.assertTrue(
-                any("must be a positive integer" in error for error in errors)
-            )
-            self.assertTrue(any("must be a string" in error for error in errors))
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertFalse(is_valid)
+        self.assertTrue(any("must be a positive integer" in error for error in errors))
+        self.assertTrue(any("must be a string" in error for error in errors))
 
     def test_duplicate_ids(self):
         """Test that duplicate section and step IDs are caught"""
@@ -163,13 +156,10 @@ sections:
           - "Content"
 """
         temp_file = self.create_temp_yaml(duplicate_ids)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertFalse(is_valid)
-            self.assertTrue(any("Duplicate section_id" in error for error in errors))
-            self.assertTrue(any("Duplicate step_id" in error for error in errors))
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertFalse(is_valid)
+        self.assertTrue(any("Duplicate section_id" in error for error in errors))
+        self.assertTrue(any("Duplicate step_id" in error for error in errors))
 
     def test_terminal_step_validation(self):
         """Test that terminal steps cannot have questions or buckets"""
@@ -214,22 +204,14 @@ sections:
             # No next_section_and_step and last step of last section = terminal
 """
         temp_file = self.create_temp_yaml(terminal_with_question)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertFalse(is_valid)
-            # Should only flag the last step of the last section
-            terminal_errors = [e for e in errors if "Final/terminal" in e]
-            self.assertEqual(
-                len(terminal_errors), 2
-            )  # One for question, one for buckets
-            self.assertTrue(
-                any(
-                    "section_2" in error and "step_2" in error
-                    for error in terminal_errors
-                )
-            )
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertFalse(is_valid)
+        # Should only flag the last step of the last section
+        terminal_errors = [e for e in errors if "Final/terminal" in e]
+        self.assertEqual(len(terminal_errors), 2)  # One for question, one for buckets
+        self.assertTrue(
+            any("section_2" in error and "step_2" in error for error in terminal_errors)
+        )
 
     def test_metadata_operations_validation(self):
         """Test validation of metadata operations"""
@@ -257,29 +239,23 @@ sections:
           - "Done"
 """
         temp_file = self.create_temp_yaml(metadata_test)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertFalse(is_valid)
-            self.assertTrue(
-                any("metadata_clear' must be boolean" in error for error in errors)
-            )
-            self.assertTrue(
-                any(
-                    "metadata_feedback_filter' must be a list" in error
-                    for error in errors
-                )
-            )
-            self.assertTrue(
-                any(
-                    "metadata_remove' must be a string or list of strings" in error
-                    for error in errors
-                )
-            )
-            self.assertTrue(
-                any("metadata_add' must be a dictionary" in error for error in errors)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertFalse(is_valid)
+        self.assertTrue(
+            any("metadata_clear' must be boolean" in error for error in errors)
+        )
+        self.assertTrue(
+            any("metadata_feedback_filter' must be a list" in error for error in errors)
+        )
+        self.assertTrue(
+            any(
+                "metadata_remove' must be a string or list of strings" in error
+                for error in errors
             )
-        finally:
-            os.unlink(temp_file)
+        )
+        self.assertTrue(
+            any("metadata_add' must be a dictionary" in error for error in errors)
+        )
 
     def test_valid_metadata_operations(self):
         """Test that valid metadata operations pass"""
@@ -323,12 +299,9 @@ sections:
           - "Done"
 """
         temp_file = self.create_temp_yaml(valid_metadata)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertTrue(is_valid)
-            self.assertEqual(len(errors), 0)
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertTrue(is_valid)
+        self.assertEqual(len(errors), 0)
 
     def test_python_syntax_validation(self):
         """Test that Python syntax errors in scripts are caught"""
@@ -359,12 +332,9 @@ sections:
           - "Done"
 """
         temp_file = self.create_temp_yaml(python_syntax_error)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertFalse(is_valid)
-            self.assertTrue(any("Python syntax error" in error for error in errors))
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertFalse(is_valid)
+        self.assertTrue(any("Python syntax error" in error for error in errors))
 
     def test_invalid_transitions(self):
         """Test validation of transition references"""
@@ -389,23 +359,15 @@ sections:
               - "This transition has no corresponding bucket"
 """
         temp_file = self.create_temp_yaml(invalid_transitions)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertFalse(is_valid)
-            # Should have errors for invalid transition targets and missing transitions
-            self.assertTrue(
-                any("Invalid transition target" in error for error in errors)
-            )
-            self.assertTrue(
-                any(
-                    "must be in format 'section_id:step_id'" in error
-                    for error in errors
-                )
-            )
-            # Should have warnings for unused transitions
-            self.assertTrue(any("Unused transition" in warning for warning in warnings))
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertFalse(is_valid)
+        # Should have errors for invalid transition targets and missing transitions
+        self.assertTrue(any("Invalid transition target" in error for error in errors))
+        self.assertTrue(
+            any("must be in format 'section_id:step_id'" in error for error in errors)
+        )
+        # Should have warnings for unused transitions
+        self.assertTrue(any("Unused transition" in warning for warning in warnings))
 
     def test_metadata_feedback_filter_warning(self):
         """Test warning when metadata_feedback_filter used without feedback_tokens_for_ai"""
@@ -431,18 +393,14 @@ sections:
           - "Done"
 """
         temp_file = self.create_temp_yaml(metadata_filter_no_feedback)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertTrue(is_valid)  # Should be valid but with warning
-            self.assertTrue(
-                any(
-                    "metadata_feedback_filter used but no feedback_tokens_for_ai"
-                    in warning
-                    for warning in warnings
-                )
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertTrue(is_valid)  # Should be valid but with warning
+        self.assertTrue(
+            any(
+                "metadata_feedback_filter used but no feedback_tokens_for_ai" in warning
+                for warning in warnings
             )
-        finally:
-            os.unlink(temp_file)
+        )
 
     def test_pre_script_warning(self):
         """Test warning when pre_script used without question"""
@@ -459,17 +417,51 @@ sections:
           print("This is unusual without a question")
 """
         temp_file = self.create_temp_yaml(pre_script_no_question)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertTrue(is_valid)  # Should be valid but with warning
-            self.assertTrue(
-                any(
-                    "pre_script typically used with question steps" in warning
-                    for warning in warnings
-                )
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertTrue(is_valid)  # Should be valid but with warning
+        self.assertTrue(
+            any(
+                "pre_script typically used with question steps" in warning
+                for warning in warnings
             )
-        finally:
-            os.unlink(temp_file)
+        )
+
+    def test_match_bucket_labels_validation(self):
+        """Test match_bucket_labels must be a boolean on a question step"""
+        yaml_template = """
+sections:
+  - section_id: "section_1"
+    title: "Test"
+    steps:
+      - step_id: "step_1"
+        title: "Menu"
+        question: "Pick one"
+        match_bucket_labels: {value}
+        buckets:
+          - left
+          - right
+        transitions:
+          left:
+            next_section_and_step: "section_1:step_2"
+          right:
+            next_section_and_step: "section_1:step_2"
+      - step_id: "step_2"
+        title: "Final"
+        content_blocks:
+          - "Done"
+"""
+        is_valid, errors, warnings = self.validator.validate_file(
+            self.create_temp_yaml(yaml_template.format(value="true"))
+        )
+        self.assertTrue(is_valid, errors)
+
+        is_valid, errors, warnings = self.validator.validate_file(
+            self.create_temp_yaml(yaml_template.format(value='"yes"'))
+        )
+        self.assertFalse(is_valid)
+        self.assertTrue(
+            any("match_bucket_labels must be boolean" in error for error in errors)
+        )
 
     def test_empty_else_block_detection(self):
         """Test detection of empty else blocks in Python code"""
@@ -498,14 +490,11 @@ sections:
           - "Done"
 """
         temp_file = self.create_temp_yaml(empty_else_block)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            # This should detect the empty else block
-            self.assertTrue(
-                any("'else:' block contains only comments" in error for error in errors)
-            )
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        # This should detect the empty else block
+        self.assertTrue(
+            any("'else:' block contains only comments" in error for error in errors)
+        )
 
     def test_content_blocks_validation(self):
         """Test validation of content_blocks structure"""
@@ -526,15 +515,12 @@ sections:
           - "Another valid string"
 """
         temp_file = self.create_temp_yaml(invalid_content_blocks)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertFalse(is_valid)
-            self.assertTrue(
-                any("content_blocks must be a list" in error for error in errors)
-            )
-            self.assertTrue(any("must be a string" in error for error in errors))
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertFalse(is_valid)
+        self.assertTrue(
+            any("content_blocks must be a list" in error for error in errors)
+        )
+        self.assertTrue(any("must be a string" in error for error in errors))
 
     def test_transition_fields_validation(self):
         """Test validation of various transition fields"""
@@ -575,26 +561,20 @@ sections:
           - "Done"
 """
         temp_file = self.create_temp_yaml(invalid_transition_fields)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertFalse(is_valid)
-            self.assertTrue(
-                any(
-                    "run_processing_script' must be boolean" in error
-                    for error in errors
-                )
-            )
-            self.assertTrue(
-                any("ai_feedback' must be a dictionary" in error for error in errors)
-            )
-            self.assertTrue(
-                any("tokens_for_ai must be a string" in error for error in errors)
-            )
-            self.assertTrue(
-                any("content_blocks' must be a list" in error for error in errors)
-            )
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertFalse(is_valid)
+        self.assertTrue(
+            any("run_processing_script' must be boolean" in error for error in errors)
+        )
+        self.assertTrue(
+            any("ai_feedback' must be a dictionary" in error for error in errors)
+        )
+        self.assertTrue(
+            any("tokens_for_ai must be a string" in error for error in errors)
+        )
+        self.assertTrue(
+            any("content_blocks' must be a list" in error for error in errors)
+        )
 
     def test_using_existing_failing_fixture(self):
         """Test using the existing failing fixture we created"""
@@ -633,12 +613,9 @@ sections:
           - "Done"
 """
         temp_file = self.create_temp_yaml(valid_feedback_prompts)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertTrue(is_valid)
-            self.assertEqual(len(errors), 0)
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertTrue(is_valid)
+        self.assertEqual(len(errors), 0)
 
     def test_invalid_feedback_prompts(self):
         """Test validation of invalid feedback_prompts structure"""
@@ -689,28 +666,25 @@ sections:
             content_blocks: ["Done"]
 """
         temp_file = self.create_temp_yaml(invalid_feedback_prompts)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertFalse(is_valid)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertFalse(is_valid)
 
-            # Check for specific error types
-            self.assertTrue(
-                any("feedback_prompts' must be a list" in error for error in errors)
-            )
-            self.assertTrue(
-                any("feedback_prompts' cannot be empty" in error for error in errors)
-            )
-            self.assertTrue(any("must be a dictionary" in error for error in errors))
-            self.assertTrue(any("missing required field" in error for error in errors))
-            self.assertTrue(
-                any("duplicate feedback prompt name" in error for error in errors)
-            )
-            self.assertTrue(any("name must be a string" in error for error in errors))
-            self.assertTrue(
-                any("tokens_for_ai must be a string" in error for error in errors)
-            )
-        finally:
-            os.unlink(temp_file)
+        # Check for specific error types
+        self.assertTrue(
+            any("feedback_prompts' must be a list" in error for error in errors)
+        )
+        self.assertTrue(
+            any("feedback_prompts' cannot be empty" in error for error in errors)
+        )
+        self.assertTrue(any("must be a dictionary" in error for error in errors))
+        self.assertTrue(any("missing required field" in error for error in errors))
+        self.assertTrue(
+            any("duplicate feedback prompt name" in error for error in errors)
+        )
+        self.assertTrue(any("name must be a string" in error for error in errors))
+        self.assertTrue(
+            any("tokens_for_ai must be a string" in error for error in errors)
+        )
 
     def test_both_feedback_systems(self):
         """Test that both feedback_tokens_for_ai and feedback_prompts can be used together"""
@@ -740,12 +714,9 @@ sections:
           - "Done"
 """
         temp_file = self.create_temp_yaml(both_feedback_systems)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertTrue(is_valid, f"Should be valid but got errors: {errors}")
-            self.assertEqual(len(errors), 0)
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertTrue(is_valid, f"Should be valid but got errors: {errors}")
+        self.assertEqual(len(errors), 0)
 
     def test_cli_integration(self):
         """Test the command line interface"""
@@ -784,33 +755,26 @@ sections:
           script_result = {'metadata': {}}
 """
 
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".yaml", delete=False) as f:
-            f.write(warning_yaml)
-            warning_file = f.name
-
-        try:
-            # Test with --strict flag (warnings become errors)
-            result = subprocess.run(
-                [
-                    sys.executable,
-                    "activity_yaml_validator.py",
-                    warning_file,
-                    "--strict",
-                ],
-                capture_output=True,
-                text=True,
-                cwd=".",
-            )
-
-            # Should fail (exit code 1) because warnings become errors in strict mode
-            self.assertEqual(
-                result.returncode,
-                1,
-                f"Expected strict mode to fail with warnings. Output: {result.stdout}",
-            )
+        warning_file = self.create_temp_yaml(warning_yaml)
+        # Test with --strict flag (warnings become errors)
+        result = subprocess.run(
+            [
+                sys.executable,
+                "activity_yaml_validator.py",
+                warning_file,
+                "--strict",
+            ],
+            capture_output=True,
+            text=True,
+            cwd=".",
+        )
 
-        finally:
-            os.unlink(warning_file)
+        # Should fail (exit code 1) because warnings become errors in strict mode
+        self.assertEqual(
+            result.returncode,
+            1,
+            f"Expected strict mode to fail with warnings. Output: {result.stdout}",
+        )
 
     def test_jinja2_control_structures_rejected(self):
         """Test that Jinja2 control structures are rejected"""
@@ -838,22 +802,16 @@ sections:
             content_blocks: ["Done"]
 """
         temp_file = self.create_temp_yaml(jinja2_control_yaml)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertFalse(is_valid)
-            # Should have multiple errors for different Jinja2 control structures
-            jinja2_errors = [e for e in errors if "Jinja2" in e]
-            self.assertGreater(len(jinja2_errors), 0)
-            # Check that error messages mention the right thing
-            self.assertTrue(any("NOT supported" in error for error in jinja2_errors))
-            self.assertTrue(
-                any(
-                    "show_if" in error or "pre-compute" in error
-                    for error in jinja2_errors
-                )
-            )
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertFalse(is_valid)
+        # Should have multiple errors for different Jinja2 control structures
+        jinja2_errors = [e for e in errors if "Jinja2" in e]
+        self.assertGreater(len(jinja2_errors), 0)
+        # Check that error messages mention the right thing
+        self.assertTrue(any("NOT supported" in error for error in jinja2_errors))
+        self.assertTrue(
+            any("show_if" in error or "pre-compute" in error for error in jinja2_errors)
+        )
 
     def test_handlebars_control_structures_rejected(self):
         """Test that Handlebars control structures are rejected"""
@@ -878,18 +836,13 @@ sections:
             content_blocks: ["Done"]
 """
         temp_file = self.create_temp_yaml(handlebars_yaml)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertFalse(is_valid)
-            # Should have multiple errors for different Handlebars control structures
-            handlebars_errors = [e for e in errors if "Handlebars" in e]
-            self.assertGreater(len(handlebars_errors), 0)
-            # Check that error messages mention the right thing
-            self.assertTrue(
-                any("NOT supported" in error for error in handlebars_errors)
-            )
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertFalse(is_valid)
+        # Should have multiple errors for different Handlebars control structures
+        handlebars_errors = [e for e in errors if "Handlebars" in e]
+        self.assertGreater(len(handlebars_errors), 0)
+        # Check that error messages mention the right thing
+        self.assertTrue(any("NOT supported" in error for error in handlebars_errors))
 
     def test_valid_substitutions_allowed(self):
         """Test that valid {{variable}} substitutions are allowed"""
@@ -929,15 +882,12 @@ sections:
           - "Goodbye {{username}}!"
 """
         temp_file = self.create_temp_yaml(valid_substitutions_yaml)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertTrue(
-                is_valid,
-                f"Valid substitutions should be allowed but got errors: {errors}",
-            )
-            self.assertEqual(len(errors), 0)
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertTrue(
+            is_valid,
+            f"Valid substitutions should be allowed but got errors: {errors}",
+        )
+        self.assertEqual(len(errors), 0)
 
     def test_control_structures_in_hints(self):
         """Test that control structures in hints are rejected"""
@@ -961,14 +911,11 @@ sections:
             content_blocks: ["Done"]
 """
         temp_file = self.create_temp_yaml(hints_with_control_yaml)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertFalse(is_valid)
-            # Should catch control structures in hints
-            hint_errors = [e for e in errors if "hints" in e]
-            self.assertGreater(len(hint_errors), 0)
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertFalse(is_valid)
+        # Should catch control structures in hints
+        hint_errors = [e for e in errors if "hints" in e]
+        self.assertGreater(len(hint_errors), 0)
 
     def test_control_structures_in_feedback_prompts(self):
         """Test that control structures in feedback_prompts are rejected"""
@@ -992,14 +939,11 @@ sections:
             content_blocks: ["Done"]
 """
         temp_file = self.create_temp_yaml(feedback_prompts_control_yaml)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertFalse(is_valid)
-            # Should catch control structures in feedback_prompts
-            feedback_errors = [e for e in errors if "feedback_prompts" in e]
-            self.assertGreater(len(feedback_errors), 0)
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertFalse(is_valid)
+        # Should catch control structures in feedback_prompts
+        feedback_errors = [e for e in errors if "feedback_prompts" in e]
+        self.assertGreater(len(feedback_errors), 0)
 
     def test_control_structures_in_conditional_content_blocks(self):
         """Test that control structures in conditional content_blocks are rejected"""
@@ -1032,14 +976,11 @@ sections:
           - "Done"
 """
         temp_file = self.create_temp_yaml(conditional_blocks_yaml)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertFalse(is_valid)
-            # Should catch control structures in conditional content blocks
-            control_errors = [e for e in errors if "Jinja2" in e or "Handlebars" in e]
-            self.assertGreater(len(control_errors), 0)
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertFalse(is_valid)
+        # Should catch control structures in conditional content blocks
+        control_errors = [e for e in errors if "Jinja2" in e or "Handlebars" in e]
+        self.assertGreater(len(control_errors), 0)
 
     def test_mixed_valid_and_invalid_templates(self):
         """Test file with both valid substitutions and invalid control structures"""
@@ -1065,16 +1006,13 @@ sections:
             content_blocks: ["Done"]
 """
         temp_file = self.create_temp_yaml(mixed_yaml)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertFalse(is_valid)
-            # Should only have errors for the control structures, not the valid substitutions
-            control_errors = [e for e in errors if "Jinja2" in e or "Handlebars" in e]
-            self.assertGreater(len(control_errors), 0)
-            # Should have exactly 2 errors (one for content_block, one for tokens_for_ai)
-            self.assertEqual(len(control_errors), 2)
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertFalse(is_valid)
+        # Should only have errors for the control structures, not the valid substitutions
+        control_errors = [e for e in errors if "Jinja2" in e or "Handlebars" in e]
+        self.assertGreater(len(control_errors), 0)
+        # Should have exactly 2 errors (one for content_block, one for tokens_for_ai)
+        self.assertEqual(len(control_errors), 2)
 
     def test_various_jinja2_statements(self):
         """Test detection of various Jinja2 statement types"""
@@ -1100,15 +1038,12 @@ sections:
             content_blocks: ["Done"]
 """
         temp_file = self.create_temp_yaml(various_jinja2_yaml)
-        try:
-            is_valid, errors, warnings = self.validator.validate_file(temp_file)
-            self.assertFalse(is_valid)
-            # Should catch all the different Jinja2 statement types
-            jinja2_errors = [e for e in errors if "Jinja2" in e]
-            # Should have multiple errors for different statements
-            self.assertGreaterEqual(len(jinja2_errors), 5)
-        finally:
-            os.unlink(temp_file)
+        is_valid, errors, warnings = self.validator.validate_file(temp_file)
+        self.assertFalse(is_valid)
+        # Should catch all the different Jinja2 statement types
+        jinja2_errors = [e for e in errors if "Jinja2" in e]
+        # Should have multiple errors for different statements
+        self.assertGreaterEqual(len(jinja2_errors), 5)
 
 
 if __name__ == "__main__":
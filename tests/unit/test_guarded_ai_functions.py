@@ -10,11 +10,15 @@ Tests the core feedback generation functions including:
 - Categorization and feedback generation
 """
 
+import io
+import threading
+import time
 import unittest
 from unittest.mock import patch, MagicMock, call
 import sys
 from pathlib import Path
 import json
+from openai import BadRequestError
 
 # Add parent directory to path to import guarded_ai
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "research"))
@@ -23,8 +27,21 @@ from guarded_ai import (
     provide_feedback_prompts,
     categorize_response,
     generate_ai_feedback,
+    generate_batched_ai_feedback,
     get_openai_client_and_model,
     initialize_model_map,
+    get_client_for_endpoint,
+    load_yaml_activity,
+    prepare_activity,
+    get_step,
+    get_next_section_and_step,
+    precompute_translations,
+    load_translations,
+    translate_text,
+    _cache_put,
+    _compile_metadata_ops,
+    _compile_metadata_value,
+    _translate_blocks,
 )
 
 
@@ -33,6 +50,14 @@ class TestGuardedAI(unittest.TestCase):
 
     def setUp(self):
         """Set up test fixtures"""
+        # Start every test with an empty categorization cache
+        cache_patcher = patch.dict("guarded_ai._CATEGORY_CACHE", clear=True)
+        cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+        unsupported_patcher = patch("guarded_ai._BATCH_FEEDBACK_UNSUPPORTED", set())
+        unsupported_patcher.start()
+        self.addCleanup(unsupported_patcher.stop)
+
         self.sample_metadata = {
             "player_health": 100,
             "enemy_health": 80,
@@ -82,10 +107,12 @@ class TestGuardedAI(unittest.TestCase):
         self.assertEqual(call_args["max_tokens"], 5)
         self.assertEqual(call_args["temperature"], 0)
 
-        # Check message content
+        # Check message content: only the response is in the user message
         messages = call_args["messages"]
         self.assertEqual(len(messages), 2)
         self.assertIn("correct_answer, wrong_answer", messages[0]["content"])
+        self.assertIn("Question: What is 2+2?", messages[0]["content"])
+        self.assertEqual(messages[1]["content"], "Response: Four\n\nCategory:")
 
     @patch("guarded_ai.get_openai_client_and_model")
     def test_generate_ai_feedback(self, mock_get_client):
@@ -169,14 +196,19 @@ class TestGuardedAI(unittest.TestCase):
         # Since our test metadata doesn't have the filtered keys, it should be empty or contain only matching keys
         # But the function should have passed what it received
 
+    @patch("guarded_ai.generate_batched_ai_feedback", return_value=None)
     @patch("guarded_ai.generate_ai_feedback")
-    def test_provide_feedback_prompts(self, mock_generate_feedback):
-        """Test new multi-prompt feedback system"""
-        # Setup mock to return different feedback for each prompt
-        mock_generate_feedback.side_effect = [
-            "Hit at A5, miss at B3",
-            "No ships were sunk this round",
-        ]
+    def test_provide_feedback_prompts(self, mock_generate_feedback, mock_batched):
+        """Test new multi-prompt feedback system (per-prompt fallback)"""
+
+        # Setup mock to return different feedback for each prompt; prompts run
+        # concurrently, so key the reply on the prompt rather than call order
+        def feedback_for_prompt(category, question, response, tokens, *args):
+            if "hit/miss" in tokens:
+                return "Hit at A5, miss at B3"
+            return "No ships were sunk this round"
+
+        mock_generate_feedback.side_effect = feedback_for_prompt
 
         # Test data
         transition = self.sample_transition
@@ -219,18 +251,169 @@ class TestGuardedAI(unittest.TestCase):
             feedback_messages[1]["content"], "No ships were sunk this round"
         )
 
-        # Verify generate_ai_feedback was called twice
+        # Batched attempt failed, so generate_ai_feedback was called twice
+        mock_batched.assert_called_once()
         self.assertEqual(mock_generate_feedback.call_count, 2)
 
+    @patch("guarded_ai.generate_batched_ai_feedback")
     @patch("guarded_ai.generate_ai_feedback")
-    def test_provide_feedback_prompts_empty_responses(self, mock_generate_feedback):
+    def test_provide_feedback_prompts_batched(
+        self, mock_generate_feedback, mock_batched
+    ):
+        """Test that prompts sharing the same inputs use one batched request"""
+        mock_batched.return_value = {"hit_miss": "Hit at A5", "ship_sinking": "STFU"}
+        feedback_prompts = [
+            {"name": "hit_miss", "tokens_for_ai": "Report hits"},
+            {"name": "ship_sinking", "tokens_for_ai": "Report sinkings"},
+        ]
+
+        feedback_messages = provide_feedback_prompts(
+            self.sample_transition,
+            "valid_move",
+            "Where do you want to shoot?",
+            feedback_prompts,
+            "A5",
+            "English",
+            self.sample_metadata,
+            "Battleship narrator.",
+        )
+
+        # STFU replies are still filtered out
+        self.assertEqual(
+            feedback_messages, [{"name": "hit_miss", "content": "Hit at A5"}]
+        )
+        mock_generate_feedback.assert_not_called()
+        args = mock_batched.call_args[0]
+        self.assertEqual(
+            args[3], {"hit_miss": "Report hits", "ship_sinking": "Report sinkings"}
+        )
+        self.assertIn("Battleship narrator.", args[4])
+        self.assertIn("Provide the feedback in English.", args[4])
+
+    @patch("guarded_ai.generate_batched_ai_feedback")
+    @patch("guarded_ai.generate_ai_feedback", return_value="Feedback")
+    def test_provide_feedback_prompts_divergent_filters_not_batched(
+        self, mock_generate_feedback, mock_batched
+    ):
+        """Test that prompts with different metadata views are sent separately"""
+        feedback_prompts = [
+            {
+                "name": "shots",
+                "tokens_for_ai": "Shots",
+                "metadata_filter": ["user_shot"],
+            },
+            {"name": "health", "tokens_for_ai": "Health"},
+        ]
+
+        feedback_messages = provide_feedback_prompts(
+            {},
+            "valid_move",
+            "Where do you want to shoot?",
+            feedback_prompts,
+            "A5",
+            "English",
+            self.sample_metadata,
+        )
+
+        mock_batched.assert_not_called()
+        self.assertEqual(mock_generate_feedback.call_count, 2)
+        self.assertEqual([m["name"] for m in feedback_messages], ["shots", "health"])
+
+    @patch("guarded_ai.get_openai_client_and_model")
+    def test_generate_batched_ai_feedback(self, mock_get_client):
+        """Test parsing of the batched JSON feedback reply"""
+        mock_client = MagicMock()
+        mock_completion = MagicMock()
+        mock_completion.choices[0].message.content = json.dumps(
+            {"a": "Feedback A", "b": "Feedback B"}
+        )
+        mock_client.chat.completions.create.return_value = mock_completion
+        mock_get_client.return_value = (mock_client, "test-model")
+
+        feedback = generate_batched_ai_feedback(
+            "cat", "Q?", "A", {"a": "Prompt A", "b": "Prompt B"}, "tokens", {}
+        )
+
+        self.assertEqual(feedback, {"a": "Feedback A", "b": "Feedback B"})
+        call_args = mock_client.chat.completions.create.call_args[1]
+        self.assertEqual(call_args["response_format"], {"type": "json_object"})
+        self.assertIn("- a: Prompt A", call_args["messages"][0]["content"])
+
+        # Missing prompt names make the caller fall back to per-prompt requests
+        mock_completion.choices[0].message.content = json.dumps({"a": "Only A"})
+        feedback = generate_batched_ai_feedback(
+            "cat", "Q?", "A", {"a": "Prompt A", "b": "Prompt B"}, "tokens", {}
+        )
+        self.assertIsNone(feedback)
+
+    @patch("guarded_ai.get_openai_client_and_model")
+    def test_generate_batched_ai_feedback_remembers_unsupported_endpoint(
+        self, mock_get_client
+    ):
+        """Test that an endpoint rejecting JSON mode isn't asked again"""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.side_effect = BadRequestError(
+            "Error code: 400 - 'response_format' of type 'json_object' is not supported",
+            response=MagicMock(status_code=400),
+            body=None,
+        )
+        mock_get_client.return_value = (mock_client, "test-model")
+        prompts = {"a": "Prompt A", "b": "Prompt B"}
+
+        with patch("builtins.print"):
+            first = generate_batched_ai_feedback("cat", "Q?", "A", prompts, "t", {})
+            second = generate_batched_ai_feedback("cat", "Q?", "A", prompts, "t", {})
+
+        self.assertIsNone(first)
+        self.assertIsNone(second)
+        mock_client.chat.completions.create.assert_called_once()
+
+    @patch("guarded_ai.get_openai_client_and_model")
+    def test_generate_batched_ai_feedback_retries_after_one_off_failures(
+        self, mock_get_client
+    ):
+        """Test that bad JSON or an unrelated error doesn't disable batching"""
+        mock_client = MagicMock()
+        bad_json = MagicMock()
+        bad_json.choices[0].message.content = '{"a": "trunc'
+        good_json = MagicMock()
+        good_json.choices[0].message.content = '{"a": "Fine", "b": "Good"}'
+        mock_client.chat.completions.create.side_effect = [
+            bad_json,
+            BadRequestError(
+                "Error code: 400 - context length exceeded",
+                response=MagicMock(status_code=400),
+                body=None,
+            ),
+            good_json,
+        ]
+        mock_get_client.return_value = (mock_client, "test-model")
+        prompts = {"a": "Prompt A", "b": "Prompt B"}
+
+        with patch("builtins.print"):
+            results = [
+                generate_batched_ai_feedback("cat", "Q?", "A", prompts, "t", {})
+                for _ in range(3)
+            ]
+
+        self.assertEqual(results, [None, None, {"a": "Fine", "b": "Good"}])
+        self.assertEqual(mock_client.chat.completions.create.call_count, 3)
+
+    @patch("guarded_ai.generate_batched_ai_feedback", return_value=None)
+    @patch("guarded_ai.generate_ai_feedback")
+    def test_provide_feedback_prompts_empty_responses(
+        self, mock_generate_feedback, mock_batched
+    ):
         """Test that empty feedback responses are filtered out"""
         # Setup mock to return empty/whitespace responses
-        mock_generate_feedback.side_effect = [
-            "",  # Empty response
-            "   ",  # Whitespace only
-            "Valid feedback",  # Valid response
-        ]
+        replies = {
+            "Empty prompt": "",  # Empty response
+            "Whitespace prompt": "   ",  # Whitespace only
+            "Valid prompt": "Valid feedback",  # Valid response
+        }
+        mock_generate_feedback.side_effect = lambda c, q, r, tokens, *args: next(
+            reply for prompt, reply in replies.items() if prompt in tokens
+        )
 
         transition = {}
         category = "test"
@@ -318,6 +501,80 @@ class TestGuardedAI(unittest.TestCase):
                 guarded_ai.MODEL_CLIENT_MAP["test-model-id"][1], "http://test.com"
             )
 
+    def test_model_map_initialized_on_first_use(self):
+        """Test the model map is built lazily, once, by get_openai_client_and_model"""
+        import guarded_ai
+
+        with patch.object(guarded_ai, "_model_map_initialized", False), patch(
+            "guarded_ai.initialize_model_map"
+        ) as mock_init, patch.dict(guarded_ai.MODEL_CLIENT_MAP, {}, clear=True):
+            mock_init.side_effect = lambda: setattr(
+                guarded_ai, "_model_map_initialized", True
+            )
+            with patch("guarded_ai.get_client_for_endpoint"):
+                get_openai_client_and_model("gpt-test")
+                get_openai_client_and_model("gpt-test")
+
+            mock_init.assert_called_once_with()
+
+    @patch.dict(
+        "os.environ",
+        {"MODEL_ENDPOINT_9": "http://blocking.test", "MODEL_API_KEY_9": "key"},
+    )
+    def test_model_map_concurrent_first_use_waits_for_build(self):
+        """Test a second caller blocks until the first has built the map"""
+        import guarded_ai
+
+        listing = threading.Event()
+        release = threading.Event()
+        blocking_client = MagicMock()
+        blocking_model = MagicMock()
+        blocking_model.id = "blocking-model"
+
+        def list_models():
+            listing.set()
+            release.wait(5)
+            return MagicMock(data=[blocking_model])
+
+        blocking_client.models.list.side_effect = list_models
+        other_client = MagicMock()
+        other_client.models.list.return_value.data = []
+
+        def client_for(endpoint, api_key):
+            return (
+                blocking_client if endpoint == "http://blocking.test" else other_client
+            )
+
+        results = {}
+
+        def resolve(name):
+            results[name] = get_openai_client_and_model("blocking-model")
+
+        # Locks from the threading module in effect now, in case gevent has
+        # already patched threads into greenlets
+        with patch.object(guarded_ai, "_model_map_initialized", False), patch.object(
+            guarded_ai, "_MODEL_MAP_LOCK", threading.Lock()
+        ), patch.dict(guarded_ai.MODEL_CLIENT_MAP, {}, clear=True), patch(
+            "guarded_ai.get_client_for_endpoint", side_effect=client_for
+        ), patch(
+            "builtins.print"
+        ):
+            first = threading.Thread(target=resolve, args=("first",))
+            first.start()
+            self.assertTrue(listing.wait(5))
+
+            second = threading.Thread(target=resolve, args=("second",))
+            second.start()
+            second.join(0.1)
+            self.assertTrue(second.is_alive(), "resolved before the map was built")
+
+            release.set()
+            first.join(5)
+            second.join(5)
+
+        self.assertEqual(results["first"], (blocking_client, "blocking-model"))
+        self.assertEqual(results["second"], (blocking_client, "blocking-model"))
+
     @patch.dict(
         "os.environ",
         {
@@ -381,6 +638,543 @@ class TestGuardedAI(unittest.TestCase):
         # Should return error string
         self.assertIn("Error:", feedback)
 
+    @patch("guarded_ai.time.sleep")
+    @patch("guarded_ai.get_openai_client_and_model")
+    def test_categorize_response_retries_transient_errors(
+        self, mock_get_client, mock_sleep
+    ):
+        """Test that transient connection errors are retried with backoff"""
+        import httpx
+        from openai import APIConnectionError
+
+        transient = APIConnectionError(request=httpx.Request("POST", "http://test.com"))
+        mock_client = MagicMock()
+        mock_completion = MagicMock()
+        mock_completion.choices[0].message.content = "correct_answer"
+        mock_client.chat.completions.create.side_effect = [
+            transient,
+            transient,
+            mock_completion,
+        ]
+        mock_get_client.return_value = (mock_client, "test-model")
+
+        category = categorize_response("Test?", "Answer", ["correct_answer"], "tokens")
+
+        self.assertEqual(category, "correct_answer")
+        self.assertEqual(mock_client.chat.completions.create.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    def test_prepare_activity_precomputes_bucket_list(self):
+        """Test that bucket list strings are built once at load time"""
+        activity = {
+            "sections": [
+                {
+                    "section_id": "section_1",
+                    "steps": [
+                        {"step_id": "step_1", "buckets": ["correct", 1, True]},
+                        {"step_id": "step_2"},
+                    ],
+                }
+            ]
+        }
+
+        prepare_activity(activity)
+
+        steps = activity["sections"][0]["steps"]
+        self.assertEqual(steps[0]["_bucket_list_str"], "correct, 1, True")
+        self.assertEqual(steps[0]["_bucket_set"], {"correct", "1", "true"})
+        self.assertNotIn("_bucket_list_str", steps[1])
+
+    def test_prepare_activity_freezes_feedback_filter(self):
+        """Test that metadata_feedback_filter gets a set for membership checks"""
+        transition = {"metadata_feedback_filter": ["score", "level"]}
+        activity = {
+            "sections": [
+                {
+                    "section_id": "section_1",
+                    "steps": [
+                        {"step_id": "step_1", "transitions": {"correct": transition}}
+                    ],
+                }
+            ]
+        }
+
+        prepare_activity(activity)
+
+        self.assertEqual(transition["_feedback_filter"], frozenset({"score", "level"}))
+        self.assertEqual(transition["metadata_feedback_filter"], ["score", "level"])
+
+    def test_load_yaml_activity_accepts_stream(self):
+        """Test that an open text stream is parsed without touching disk"""
+        stream = io.StringIO(
+            "sections:\n"
+            "  - section_id: section_1\n"
+            "    steps:\n"
+            "      - step_id: step_1\n"
+            "        buckets: [correct]\n"
+        )
+
+        activity = load_yaml_activity(stream)
+
+        step = activity["sections"][0]["steps"][0]
+        self.assertEqual(step["step_id"], "step_1")
+        self.assertEqual(step["_bucket_list_str"], "correct")
+
+    def test_prepare_activity_normalizes_transition_keys(self):
+        """Test that transition keys are indexed by their classifier label"""
+        activity = {
+            "sections": [
+                {
+                    "section_id": "section_1",
+                    "steps": [
+                        {
+                            "step_id": "step_1",
+                            "transitions": {1912: {}, True: {}, "Correct": {}},
+                        }
+                    ],
+                }
+            ]
+        }
+
+        prepare_activity(activity)
+
+        norm = activity["sections"][0]["steps"][0]["_transitions_norm"]
+        self.assertEqual(norm["1912"], 1912)
+        self.assertIs(norm["yes"], True)
+        self.assertIs(norm["true"], True)
+        self.assertEqual(norm["correct"], "Correct")
+        self.assertNotIn("no", norm)
+
+    def test_transition_key_keeps_legacy_matches(self):
+        """Test the bucket lookup still matches what exact/int()/bool() did"""
+        import guarded_ai
+
+        def key_for(transitions, bucket):
+            norm = guarded_ai._normalize_bucket_keys(transitions)
+            return guarded_ai._transition_key(transitions, norm, bucket)
+
+        self.assertEqual(key_for({1912: {}}, "01912"), 1912)
+        self.assertEqual(key_for({"01912": {}, 1912: {}}, "01912"), "01912")
+        self.assertIs(key_for({True: {}}, "1"), True)
+        self.assertIs(key_for({False: {}}, "0"), False)
+        self.assertEqual(key_for({1: {}}, "yes"), 1)
+        self.assertEqual(key_for({"correct": {}, "Correct": {}}, "Correct"), "Correct")
+        self.assertEqual(key_for({"Storm": {}}, "storm"), "Storm")
+        self.assertIs(key_for({True: {}}, "2"), guarded_ai._NO_TRANSITION)
+
+    def test_cache_put_evicts_safely_across_threads(self):
+        """Test that concurrent inserts into a full cache never double-evict"""
+
+        class SlowEvictCache(dict):
+            # Yield mid-eviction so an unguarded second thread would pick
+            # the same oldest key before the first one deletes it
+            def __delitem__(self, key):
+                time.sleep(0.05)
+                super().__delitem__(key)
+
+        cache = SlowEvictCache(oldest=0, newer=1)
+        errors = []
+
+        def put(key):
+            try:
+                _cache_put(cache, key, key, 2)
+            except Exception as e:
+                errors.append(e)
+
+        # A lock from the threading module in effect now: once another suite
+        # has imported app.py, gevent has monkey-patched threads into
+        # greenlets, and the module's OS-level lock would block them all
+        with patch("guarded_ai._CACHE_LOCK", threading.Lock()):
+            threads = [threading.Thread(target=put, args=(key,)) for key in "ab"]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(set(cache), {"a", "b"})
+
+    def test_compile_metadata_value_operations(self):
+        """Test the metadata_add value mini-language"""
+        metadata = {"score": 10, "items": "sword,shield"}
+
+        def run(value, key, user_response="", is_tmp=False):
+            return _compile_metadata_value(value, key, is_tmp)(metadata, user_response)
+
+        self.assertEqual(run("the-users-response", "k", "hi"), "hi")
+        self.assertEqual(run("n+5", "score"), 15)
+        self.assertEqual(run("n-3", "score"), 7)
+        self.assertEqual(run("n+,bow", "items"), "sword,shield,bow")
+        self.assertEqual(run("n-,sword", "items"), "shield")
+        self.assertEqual(run("n+,bow", "new"), "bow")
+        self.assertEqual(run(42, "k"), 42)
+        self.assertEqual(run("n+abc", "k"), "n+abc")
+
+        # Compiled ops read metadata when run, not when compiled
+        ops = dict(_compile_metadata_ops({"score": "n+5", "items": "n-,shield"}))
+        metadata["score"] = 20
+        self.assertEqual(ops["score"](metadata, ""), 25)
+        self.assertEqual(ops["items"](metadata, ""), "sword")
+
+        with patch("guarded_ai.random.randint", return_value=4):
+            self.assertEqual(run("n+random(1,6)", "score"), 24)
+            self.assertEqual(run("n+random(1,6)", "score", is_tmp=True), 4)
+
+    def test_get_client_for_endpoint_is_cached(self):
+        """Test that clients are reused per (endpoint, api_key)"""
+        with patch.dict("guarded_ai._CLIENT_CACHE", clear=True):
+            with patch("guarded_ai.OpenAI") as mock_openai:
+                mock_openai.side_effect = lambda **kwargs: MagicMock()
+
+                first = get_client_for_endpoint("http://test.com", "key-a")
+                second = get_client_for_endpoint("http://test.com", "key-a")
+                other = get_client_for_endpoint("http://test.com", "key-b")
+
+                self.assertIs(first, second)
+                self.assertIsNot(first, other)
+                self.assertEqual(mock_openai.call_count, 2)
+
+    @patch("guarded_ai.get_openai_client_and_model")
+    def test_categorize_response_caches_results(self, mock_get_client):
+        """Test that identical classifier inputs skip the API call"""
+        mock_client = MagicMock()
+        mock_completion = MagicMock()
+        mock_completion.choices[0].message.content = "correct_answer"
+        mock_client.chat.completions.create.return_value = mock_completion
+        mock_get_client.return_value = (mock_client, "test-model")
+
+        args = ("What is 2+2?", "Four", ["correct_answer", "wrong_answer"], "Math")
+        self.assertEqual(categorize_response(*args), "correct_answer")
+        self.assertEqual(categorize_response(*args), "correct_answer")
+        mock_client.chat.completions.create.assert_called_once()
+
+        # A different response is a cache miss
+        categorize_response("What is 2+2?", "Five", args[2], args[3])
+        self.assertEqual(mock_client.chat.completions.create.call_count, 2)
+
+    @patch("guarded_ai.get_openai_client_and_model")
+    def test_categorize_response_does_not_cache_errors(self, mock_get_client):
+        """Test that failed classifications are retried on the next call"""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.side_effect = Exception("API Error")
+        mock_get_client.return_value = (mock_client, "test-model")
+
+        categorize_response("Test?", "Answer", ["bucket1"], "tokens")
+        categorize_response("Test?", "Answer", ["bucket1"], "tokens")
+
+        self.assertEqual(mock_client.chat.completions.create.call_count, 2)
+
+    @patch.dict("guarded_ai._TRANSLATION_CACHE", clear=True)
+    @patch("guarded_ai.get_openai_client_and_model")
+    def test_translate_text_caches_translations(self, mock_get_client):
+        """Test that repeated translations reuse the cached result"""
+        mock_client = MagicMock()
+        mock_completion = MagicMock()
+        mock_completion.choices[0].message.content = "Hola"
+        mock_client.chat.completions.create.return_value = mock_completion
+        mock_get_client.return_value = (mock_client, "test-model")
+
+        self.assertEqual(translate_text("Hello", "Spanish"), "Hola")
+        self.assertEqual(translate_text("Hello", "spanish"), "Hola")
+        mock_client.chat.completions.create.assert_called_once()
+
+        translate_text("Hello", "French")
+        self.assertEqual(mock_client.chat.completions.create.call_count, 2)
+
+    @patch.dict("guarded_ai._TRANSLATION_CACHE", clear=True)
+    @patch("guarded_ai.get_openai_client_and_model")
+    def test_translate_blocks_translates_each_block_once(self, mock_get_client):
+        """Test that content blocks are translated individually and cached"""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.side_effect = lambda **kw: MagicMock(
+            choices=[
+                MagicMock(
+                    message=MagicMock(content=f"ES:{kw['messages'][1]['content']}")
+                )
+            ]
+        )
+        mock_get_client.return_value = (mock_client, "test-model")
+
+        result = _translate_blocks(["Great job!", "Next step", "Great job!"], "Spanish")
+        self.assertEqual(result, "ES:Great job!\n\nES:Next step\n\nES:Great job!")
+        self.assertEqual(mock_client.chat.completions.create.call_count, 2)
+
+        # A block shared with another step comes from the cache
+        result = _translate_blocks(["Great job!", "Try again."], "Spanish")
+        self.assertEqual(result, "ES:Great job!\n\nES:Try again.")
+        self.assertEqual(mock_client.chat.completions.create.call_count, 3)
+
+        # English passes blocks through untouched
+        self.assertEqual(_translate_blocks(["A", "B"], "English"), "A\n\nB")
+        self.assertEqual(mock_client.chat.completions.create.call_count, 3)
+
+    @patch.dict("guarded_ai._TRANSLATION_CACHE", clear=True)
+    def test_precompute_and_load_translations(self):
+        """Test that static activity text is translated once and reloaded"""
+        import tempfile
+        import os
+
+        activity_yaml = """
+sections:
+  - section_id: section_1
+    steps:
+      - step_id: step_1
+        content_blocks:
+          - Welcome!
+        question: What is your name?
+        transitions:
+          correct:
+            content_blocks:
+              - "Hello {{metadata.name}}"
+"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            activity_file = os.path.join(tmpdir, "activity.yaml")
+            with open(activity_file, "w") as f:
+                f.write(activity_yaml)
+
+            with patch(
+                "guarded_ai.translate_text", side_effect=lambda text, *a: f"ES:{text}"
+            ) as mock_translate:
+                translations = precompute_translations(activity_file, "Spanish")
+
+            # Templated transition text is left for runtime translation
+            self.assertEqual(mock_translate.call_count, 2)
+            self.assertEqual(
+                translations,
+                {
+                    "Welcome!": "ES:Welcome!",
+                    "What is your name?": "ES:What is your name?",
+                },
+            )
+
+            self.assertEqual(load_translations(activity_file, "Spanish"), 2)
+            self.assertEqual(load_translations(activity_file, "French"), 0)
+
+        # Loaded translations are served without an API call
+        with patch("guarded_ai.get_openai_client_and_model") as mock_get_client:
+            self.assertEqual(translate_text("Welcome!", "Spanish"), "ES:Welcome!")
+            mock_get_client.assert_not_called()
+
+    @patch.dict("guarded_ai._TRANSLATION_CACHE", clear=True)
+    def test_load_translations_seeds_every_feedback_model(self):
+        """Test steps overriding feedback_model hit the precomputed translations"""
+        import tempfile
+        import os
+        import guarded_ai
+
+        activity = guarded_ai.parse_yaml_activity("""
+feedback_model: MODEL_1
+sections:
+  - section_id: section_1
+    steps:
+      - step_id: step_1
+        content_blocks:
+          - Welcome!
+      - step_id: step_2
+        feedback_model: MODEL_2
+        content_blocks:
+          - Welcome!
+""")
+        models = guarded_ai._feedback_models(activity)
+        self.assertEqual(models, ("MODEL_1", "MODEL_2"))
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            activity_file = os.path.join(tmpdir, "activity.yaml")
+            with open(f"{activity_file}.spanish.trans.json", "w") as f:
+                json.dump({"Welcome!": "¡Bienvenido!"}, f)
+
+            self.assertEqual(load_translations(activity_file, "Spanish", models), 1)
+
+        with patch("guarded_ai.get_openai_client_and_model") as mock_get_client:
+            for model in models:
+                self.assertEqual(
+                    translate_text("Welcome!", "Spanish", model), "¡Bienvenido!"
+                )
+            mock_get_client.assert_not_called()
+
+    def test_execute_processing_script_reuses_compiled_code(self):
+        """Test that a script is compiled once and run with fresh state"""
+        import guarded_ai
+
+        script = "metadata['count'] = metadata.get('count', 0) + 1\nscript_result = {'count': metadata['count']}"
+        guarded_ai._compile_script.cache_clear()
+
+        first = guarded_ai.execute_processing_script({}, script)
+        second = guarded_ai.execute_processing_script({"count": 5}, script)
+
+        self.assertEqual(first, {"count": 1})
+        self.assertEqual(second, {"count": 6})
+        cache_info = guarded_ai._compile_script.cache_info()
+        self.assertEqual((cache_info.misses, cache_info.hits), (1, 1))
+
+    def test_prepare_activity_compiles_metadata_ops(self):
+        """Test that metadata_add values are compiled once at load time"""
+        transition = {
+            "metadata_add": {"score": "n+10", "answer": "the-users-response"},
+            "metadata_tmp_add": {"roll": "n+random(3,3)"},
+        }
+        activity = {
+            "sections": [
+                {
+                    "section_id": "section_1",
+                    "steps": [
+                        {"step_id": "step_1", "transitions": {"correct": transition}}
+                    ],
+                }
+            ]
+        }
+
+        prepare_activity(activity)
+
+        metadata = {"score": 5}
+        for key, op in transition["_ops_add"] + transition["_ops_tmp_add"]:
+            metadata[key] = op(metadata, "42")
+        self.assertEqual(metadata, {"score": 15, "answer": "42", "roll": 3})
+
+    def test_prepare_activity_tolerates_malformed_structure(self):
+        """Test that malformed sections and steps are left untouched"""
+        activity = {"sections": [{"section_id": "s", "steps": "not_a_list"}, "x"]}
+
+        self.assertIs(prepare_activity(activity), activity)
+        self.assertEqual(activity["sections"][0]["steps"], "not_a_list")
+
+        # A malformed first step in the next section must not break loading;
+        # navigation skips to the section's first well-formed step
+        activity = prepare_activity(
+            {
+                "sections": [
+                    {"section_id": "s1", "steps": [{"step_id": "a"}]},
+                    {"section_id": "s2", "steps": ["not_a_step", {"title": "b"}]},
+                    {"section_id": "s3", "steps": [{"step_id": "c"}]},
+                ]
+            }
+        )
+
+        self.assertEqual(get_next_section_and_step(activity, "s1", "a"), ("s2", None))
+        self.assertEqual(get_next_section_and_step(activity, "s2", None), ("s3", "c"))
+
+    def test_prepare_activity_indexes_steps(self):
+        """Test step lookup and navigation through the load-time index"""
+        activity = prepare_activity(
+            {
+                "sections": [
+                    {"section_id": "s1", "steps": [{"step_id": "a"}, {"step_id": "b"}]},
+                    {"section_id": "s2", "steps": [{"step_id": "a"}]},
+                ]
+            }
+        )
+
+        self.assertIs(
+            get_step(activity, "s2", "a"), activity["sections"][1]["steps"][0]
+        )
+        self.assertIsNone(get_step(activity, "s3", "a"))
+        self.assertEqual(get_next_section_and_step(activity, "s1", "a"), ("s1", "b"))
+        self.assertEqual(get_next_section_and_step(activity, "s1", "b"), ("s2", "a"))
+        self.assertEqual(get_next_section_and_step(activity, "s2", "a"), (None, None))
+        self.assertEqual(
+            get_next_section_and_step(activity, "missing", "a"), (None, None)
+        )
+
+    @patch("guarded_ai.get_openai_client_and_model")
+    def test_categorize_response_single_token_labels(self, mock_get_client):
+        """Test logit-bias classification when the model's tokenizer is known"""
+        import guarded_ai
+
+        token_ids = {"correct_answer": [101, 7], "wrong_answer": [202, 7]}
+        token_text = {101: "correct", 202: "wrong"}
+        encoding = MagicMock()
+        encoding.encode.side_effect = lambda label: token_ids[label]
+        encoding.decode.side_effect = lambda ids: token_text[ids[0]]
+
+        mock_client = MagicMock()
+        mock_completion = MagicMock()
+        mock_completion.choices[0].message.content = "wrong"
+        mock_client.chat.completions.create.return_value = mock_completion
+        mock_get_client.return_value = (mock_client, "gpt-4o-mini")
+
+        guarded_ai._bucket_first_tokens.cache_clear()
+        self.addCleanup(guarded_ai._bucket_first_tokens.cache_clear)
+        with patch("tiktoken.encoding_for_model", return_value=encoding):
+            category = categorize_response(
+                "What is 2+2?", "Five", ["correct_answer", "wrong_answer"], "Math"
+            )
+
+        self.assertEqual(category, "wrong_answer")
+        call_args = mock_client.chat.completions.create.call_args[1]
+        self.assertEqual(call_args["max_tokens"], 1)
+        self.assertEqual(call_args["logit_bias"], {101: 100, 202: 100})
+
+    def test_bucket_first_tokens_retries_after_tokenizer_failure(self):
+        """Test that a failed encoding lookup isn't cached for the process"""
+        import guarded_ai
+
+        encoding = MagicMock()
+        encoding.encode.side_effect = lambda label: [len(label)]
+        encoding.decode.side_effect = lambda ids: str(ids[0])
+        labels = ("yes", "maybe")
+
+        guarded_ai._bucket_first_tokens.cache_clear()
+        self.addCleanup(guarded_ai._bucket_first_tokens.cache_clear)
+        with patch(
+            "tiktoken.encoding_for_model",
+            side_effect=[OSError("download failed"), encoding],
+        ):
+            with self.assertRaises(OSError):
+                guarded_ai._bucket_first_tokens("gpt-4o-mini", labels)
+            token_labels = guarded_ai._bucket_first_tokens("gpt-4o-mini", labels)
+
+        self.assertEqual(token_labels, {3: ("3", "yes"), 5: ("5", "maybe")})
+
+    @patch("guarded_ai.get_openai_client_and_model")
+    def test_generate_ai_feedback_streams_deltas(self, mock_get_client):
+        """Test that feedback is streamed to on_delta and returned in full"""
+        chunks = []
+        for text in ["Great ", None, "job!"]:
+            chunk = MagicMock()
+            chunk.choices[0].delta.content = text
+            chunks.append(chunk)
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.return_value = iter(chunks)
+        mock_get_client.return_value = (mock_client, "test-model")
+
+        deltas = []
+        feedback = generate_ai_feedback(
+            "cat", "Q?", "A", "tokens", {}, on_delta=deltas.append
+        )
+
+        self.assertEqual(feedback, "Great job!")
+        self.assertEqual(deltas, ["Great ", "job!"])
+        call_args = mock_client.chat.completions.create.call_args[1]
+        self.assertTrue(call_args["stream"])
+
+    @patch("guarded_ai.get_openai_client_and_model")
+    def test_generate_ai_feedback_holds_slot_while_streaming(self, mock_get_client):
+        """Test that a streamed reply keeps its concurrency slot until read"""
+        import guarded_ai
+
+        chunk = MagicMock()
+        chunk.choices[0].delta.content = "Hi"
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.return_value = iter([chunk])
+        mock_get_client.return_value = (mock_client, "test-model")
+        slots = threading.BoundedSemaphore(1)
+        slot_free_during_stream = []
+
+        def on_delta(delta):
+            free = slots.acquire(blocking=False)
+            if free:
+                slots.release()
+            slot_free_during_stream.append(free)
+
+        with patch("guarded_ai._LLM_CALL_SLOTS", slots):
+            guarded_ai.generate_ai_feedback(
+                "cat", "Q?", "A", "tokens", {}, on_delta=on_delta
+            )
+
+        self.assertEqual(slot_free_during_stream, [False])
+        # Released once the stream is exhausted
+        self.assertTrue(slots.acquire(blocking=False))
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
@@ -381,5 +381,32 @@ class TestActivityStateModel(unittest.TestCase):
         self.assertEqual(metadata, {})
 
 
+# Database isolation checks for the db_session fixture in conftest. Plain
+# functions, so they run under pytest and a direct unittest run skips them.
+# Both commit the same room after checking it is absent, so whichever runs
+# second fails if the first one's commit leaked.
+ISOLATION_ROOM_NAME = "isolation_probe"
+
+
+def commit_probe_room(session):
+    """Commit the probe room, asserting no earlier test left one behind"""
+    from models import Room
+
+    assert Room.query.filter_by(name=ISOLATION_ROOM_NAME).first() is None
+    session.add(Room(name=ISOLATION_ROOM_NAME))
+    session.commit()
+    assert Room.query.filter_by(name=ISOLATION_ROOM_NAME).first() is not None
+
+
+def test_db_session_rolls_back_commit_first(db_session):
+    """Test committing a room inside db_session"""
+    commit_probe_room(db_session)
+
+
+def test_db_session_rolls_back_commit_second(db_session):
+    """Test the other test's room is gone before committing again"""
+    commit_probe_room(db_session)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -7,9 +7,8 @@ to ensure they handle valid YAML, invalid syntax, missing fields,
 malformed structure, and edge cases correctly.
 """
 
+import io
 import unittest
-import tempfile
-import os
 import sys
 from pathlib import Path
 import yaml
@@ -22,12 +21,6 @@ import guarded_ai
 class TestYAMLLoading(unittest.TestCase):
     """Test YAML loading functionality"""
 
-    def create_test_yaml_file(self, content):
-        """Create temporary YAML file with given content"""
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".yaml", delete=False) as f:
-            f.write(content)
-            return f.name
-
     def test_valid_yaml_loading(self):
         """Test loading valid YAML activity file"""
         valid_yaml = """
@@ -58,34 +51,30 @@ sections:
           - "All done!"
 """
 
-        yaml_file = self.create_test_yaml_file(valid_yaml)
-        try:
-            activity = guarded_ai.load_yaml_activity(yaml_file)
-
-            # Verify basic structure
-            self.assertIn("sections", activity)
-            self.assertEqual(len(activity["sections"]), 1)
+        yaml_stream = io.StringIO(valid_yaml)
+        activity = guarded_ai.load_yaml_activity(yaml_stream)
 
-            section = activity["sections"][0]
-            self.assertEqual(section["section_id"], "test_section")
-            self.assertEqual(section["title"], "Test Section")
-            self.assertEqual(len(section["steps"]), 2)
+        # Verify basic structure
+        self.assertIn("sections", activity)
+        self.assertEqual(len(activity["sections"]), 1)
 
-            # Verify first step
-            step1 = section["steps"][0]
-            self.assertEqual(step1["step_id"], "step_1")
-            self.assertEqual(step1["title"], "Test Step")
-            self.assertIn("content_blocks", step1)
-            self.assertIn("question", step1)
-            self.assertIn("buckets", step1)
-            self.assertIn("transitions", step1)
+        section = activity["sections"][0]
+        self.assertEqual(section["section_id"], "test_section")
+        self.assertEqual(section["title"], "Test Section")
+        self.assertEqual(len(section["steps"]), 2)
 
-            # Verify transitions
-            self.assertIn("ready", step1["transitions"])
-            self.assertIn("not_ready", step1["transitions"])
+        # Verify first step
+        step1 = section["steps"][0]
+        self.assertEqual(step1["step_id"], "step_1")
+        self.assertEqual(step1["title"], "Test Step")
+        self.assertIn("content_blocks", step1)
+        self.assertIn("question", step1)
+        self.assertIn("buckets", step1)
+        self.assertIn("transitions", step1)
 
-        finally:
-            os.unlink(yaml_file)
+        # Verify transitions
+        self.assertIn("ready", step1["transitions"])
+        self.assertIn("not_ready", step1["transitions"])
 
     def test_invalid_yaml_syntax(self):
         """Test handling of invalid YAML syntax"""
@@ -98,12 +87,9 @@ sections:
         title: [invalid: yaml: syntax
 """
 
-        yaml_file = self.create_test_yaml_file(invalid_yaml)
-        try:
-            with self.assertRaises(yaml.YAMLError):
-                guarded_ai.load_yaml_activity(yaml_file)
-        finally:
-            os.unlink(yaml_file)
+        yaml_stream = io.StringIO(invalid_yaml)
+        with self.assertRaises(yaml.YAMLError):
+            guarded_ai.load_yaml_activity(yaml_stream)
 
     def test_missing_file(self):
         """Test handling of missing YAML file"""
@@ -112,12 +98,9 @@ sections:
 
     def test_empty_yaml_file(self):
         """Test handling of empty YAML file"""
-        yaml_file = self.create_test_yaml_file("")
-        try:
-            activity = guarded_ai.load_yaml_activity(yaml_file)
-            self.assertIsNone(activity)
-        finally:
-            os.unlink(yaml_file)
+        yaml_stream = io.StringIO("")
+        activity = guarded_ai.load_yaml_activity(yaml_stream)
+        self.assertIsNone(activity)
 
     def test_yaml_with_missing_sections(self):
         """Test YAML without required sections field"""
@@ -126,14 +109,11 @@ title: "Test Activity"
 description: "A test activity"
 """
 
-        yaml_file = self.create_test_yaml_file(incomplete_yaml)
-        try:
-            activity = guarded_ai.load_yaml_activity(yaml_file)
-            # Should load but won't have sections
-            self.assertNotIn("sections", activity)
-            self.assertIn("title", activity)
-        finally:
-            os.unlink(yaml_file)
+        yaml_stream = io.StringIO(incomplete_yaml)
+        activity = guarded_ai.load_yaml_activity(yaml_stream)
+        # Should load but won't have sections
+        self.assertNotIn("sections", activity)
+        self.assertIn("title", activity)
 
     def test_yaml_with_empty_sections(self):
         """Test YAML with empty sections list"""
@@ -141,13 +121,10 @@ description: "A test activity"
 sections: []
 """
 
-        yaml_file = self.create_test_yaml_file(empty_sections_yaml)
-        try:
-            activity = guarded_ai.load_yaml_activity(yaml_file)
-            self.assertIn("sections", activity)
-            self.assertEqual(len(activity["sections"]), 0)
-        finally:
-            os.unlink(yaml_file)
+        yaml_stream = io.StringIO(empty_sections_yaml)
+        activity = guarded_ai.load_yaml_activity(yaml_stream)
+        self.assertIn("sections", activity)
+        self.assertEqual(len(activity["sections"]), 0)
 
     def test_yaml_with_malformed_section_structure(self):
         """Test YAML with malformed section structure"""
@@ -158,15 +135,12 @@ sections:
     steps: "not_a_list"  # Should be a list
 """
 
-        yaml_file = self.create_test_yaml_file(malformed_yaml)
-        try:
-            activity = guarded_ai.load_yaml_activity(yaml_file)
-            # Should load but structure will be wrong
-            section = activity["sections"][0]
-            self.assertEqual(section["steps"], "not_a_list")  # String instead of list
-            self.assertNotIn("title", section)
-        finally:
-            os.unlink(yaml_file)
+        yaml_stream = io.StringIO(malformed_yaml)
+        activity = guarded_ai.load_yaml_activity(yaml_stream)
+        # Should load but structure will be wrong
+        section = activity["sections"][0]
+        self.assertEqual(section["steps"], "not_a_list")  # String instead of list
+        self.assertNotIn("title", section)
 
     def test_yaml_with_integer_and_boolean_buckets(self):
         """Test YAML with integer and boolean bucket values"""
@@ -209,31 +183,27 @@ sections:
               - "You disagreed!"
 """
 
-        yaml_file = self.create_test_yaml_file(mixed_buckets_yaml)
-        try:
-            activity = guarded_ai.load_yaml_activity(yaml_file)
-
-            # Check integer buckets
-            step1 = activity["sections"][0]["steps"][0]
-            self.assertIn(1912, step1["buckets"])
-            self.assertIn(2000, step1["buckets"])
-            self.assertIn("incorrect", step1["buckets"])
+        yaml_stream = io.StringIO(mixed_buckets_yaml)
+        activity = guarded_ai.load_yaml_activity(yaml_stream)
 
-            # Check transitions with integer keys
-            self.assertIn(1912, step1["transitions"])
-            self.assertIn(2000, step1["transitions"])
+        # Check integer buckets
+        step1 = activity["sections"][0]["steps"][0]
+        self.assertIn(1912, step1["buckets"])
+        self.assertIn(2000, step1["buckets"])
+        self.assertIn("incorrect", step1["buckets"])
 
-            # Check boolean buckets
-            step2 = activity["sections"][0]["steps"][1]
-            self.assertIn(True, step2["buckets"])
-            self.assertIn(False, step2["buckets"])
+        # Check transitions with integer keys
+        self.assertIn(1912, step1["transitions"])
+        self.assertIn(2000, step1["transitions"])
 
-            # Check transitions with boolean keys
-            self.assertIn(True, step2["transitions"])
-            self.assertIn(False, step2["transitions"])
+        # Check boolean buckets
+        step2 = activity["sections"][0]["steps"][1]
+        self.assertIn(True, step2["buckets"])
+        self.assertIn(False, step2["buckets"])
 
-        finally:
-            os.unlink(yaml_file)
+        # Check transitions with boolean keys
+        self.assertIn(True, step2["transitions"])
+        self.assertIn(False, step2["transitions"])
 
     def test_yaml_with_metadata_operations(self):
         """Test YAML with various metadata operation formats"""
@@ -263,35 +233,29 @@ sections:
               - level
 """
 
-        yaml_file = self.create_test_yaml_file(metadata_yaml)
-        try:
-            activity = guarded_ai.load_yaml_activity(yaml_file)
+        yaml_stream = io.StringIO(metadata_yaml)
+        activity = guarded_ai.load_yaml_activity(yaml_stream)
 
-            transition = activity["sections"][0]["steps"][0]["transitions"]["test"]
+        transition = activity["sections"][0]["steps"][0]["transitions"]["test"]
 
-            # Check metadata_add operations
-            self.assertIn("metadata_add", transition)
-            self.assertEqual(
-                transition["metadata_add"]["user_name"], "the-users-response"
-            )
-            self.assertEqual(transition["metadata_add"]["score"], "n+1")
-            self.assertEqual(transition["metadata_add"]["level"], 5)
+        # Check metadata_add operations
+        self.assertIn("metadata_add", transition)
+        self.assertEqual(transition["metadata_add"]["user_name"], "the-users-response")
+        self.assertEqual(transition["metadata_add"]["score"], "n+1")
+        self.assertEqual(transition["metadata_add"]["level"], 5)
 
-            # Check metadata_remove is list format
-            self.assertIn("metadata_remove", transition)
-            self.assertIsInstance(transition["metadata_remove"], list)
-            self.assertIn("old_key", transition["metadata_remove"])
-            self.assertIn("temp_data", transition["metadata_remove"])
+        # Check metadata_remove is list format
+        self.assertIn("metadata_remove", transition)
+        self.assertIsInstance(transition["metadata_remove"], list)
+        self.assertIn("old_key", transition["metadata_remove"])
+        self.assertIn("temp_data", transition["metadata_remove"])
 
-            # Check metadata_clear
-            self.assertEqual(transition["metadata_clear"], True)
+        # Check metadata_clear
+        self.assertEqual(transition["metadata_clear"], True)
 
-            # Check metadata_feedback_filter
-            self.assertIn("metadata_feedback_filter", transition)
-            self.assertIsInstance(transition["metadata_feedback_filter"], list)
-
-        finally:
-            os.unlink(yaml_file)
+        # Check metadata_feedback_filter
+        self.assertIn("metadata_feedback_filter", transition)
+        self.assertIsInstance(transition["metadata_feedback_filter"], list)
 
     def test_yaml_with_processing_scripts(self):
         """Test YAML with processing and pre-scripts"""
@@ -327,27 +291,23 @@ sections:
               - "Processing completed!"
 """
 
-        yaml_file = self.create_test_yaml_file(script_yaml)
-        try:
-            activity = guarded_ai.load_yaml_activity(yaml_file)
-
-            step = activity["sections"][0]["steps"][0]
+        yaml_stream = io.StringIO(script_yaml)
+        activity = guarded_ai.load_yaml_activity(yaml_stream)
 
-            # Check scripts are loaded as strings
-            self.assertIn("pre_script", step)
-            self.assertIsInstance(step["pre_script"], str)
-            self.assertIn("user_input", step["pre_script"])
+        step = activity["sections"][0]["steps"][0]
 
-            self.assertIn("processing_script", step)
-            self.assertIsInstance(step["processing_script"], str)
-            self.assertIn("processed", step["processing_script"])
+        # Check scripts are loaded as strings
+        self.assertIn("pre_script", step)
+        self.assertIsInstance(step["pre_script"], str)
+        self.assertIn("user_input", step["pre_script"])
 
-            # Check transition has run_processing_script flag
-            transition = step["transitions"]["valid"]
-            self.assertTrue(transition["run_processing_script"])
+        self.assertIn("processing_script", step)
+        self.assertIsInstance(step["processing_script"], str)
+        self.assertIn("processed", step["processing_script"])
 
-        finally:
-            os.unlink(yaml_file)
+        # Check transition has run_processing_script flag
+        transition = step["transitions"]["valid"]
+        self.assertTrue(transition["run_processing_script"])
 
     def test_yaml_with_nested_structures(self):
         """Test YAML with complex nested structures"""
@@ -391,42 +351,32 @@ sections:
           - "Done!"
 """
 
-        yaml_file = self.create_test_yaml_file(nested_yaml)
-        try:
-            activity = guarded_ai.load_yaml_activity(yaml_file)
-
-            step = activity["sections"][0]["steps"][0]
-            transition_a = step["transitions"]["option_a"]
+        yaml_stream = io.StringIO(nested_yaml)
+        activity = guarded_ai.load_yaml_activity(yaml_stream)
 
-            # Check nested metadata structure
-            nested_data = transition_a["metadata_add"]["nested_data"]
-            self.assertEqual(nested_data["sub_field"], "value")
-            self.assertEqual(nested_data["number"], 42)
-            self.assertIsInstance(nested_data["list_field"], list)
-            self.assertEqual(len(nested_data["list_field"]), 2)
+        step = activity["sections"][0]["steps"][0]
+        transition_a = step["transitions"]["option_a"]
 
-            # Check metadata conditions
-            conditions = transition_a["metadata_conditions"]
-            self.assertEqual(conditions["required_field"], "required_value")
-            self.assertEqual(conditions["level"], 5)
+        # Check nested metadata structure
+        nested_data = transition_a["metadata_add"]["nested_data"]
+        self.assertEqual(nested_data["sub_field"], "value")
+        self.assertEqual(nested_data["number"], 42)
+        self.assertIsInstance(nested_data["list_field"], list)
+        self.assertEqual(len(nested_data["list_field"]), 2)
 
-            # Check AI feedback structure
-            ai_feedback = transition_a["ai_feedback"]
-            self.assertIn("tokens_for_ai", ai_feedback)
+        # Check metadata conditions
+        conditions = transition_a["metadata_conditions"]
+        self.assertEqual(conditions["required_field"], "required_value")
+        self.assertEqual(conditions["level"], 5)
 
-        finally:
-            os.unlink(yaml_file)
+        # Check AI feedback structure
+        ai_feedback = transition_a["ai_feedback"]
+        self.assertIn("tokens_for_ai", ai_feedback)
 
 
 class TestActivityYAMLStructureValidation(unittest.TestCase):
     """Test validation of loaded YAML structure"""
 
-    def create_test_yaml_file(self, content):
-        """Create temporary YAML file with given content"""
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".yaml", delete=False) as f:
-            f.write(content)
-            return f.name
-
     def test_step_id_uniqueness_within_section(self):
         """Test that step IDs are unique within a section"""
         duplicate_step_yaml = """
@@ -444,18 +394,14 @@ sections:
           - "Second step"
 """
 
-        yaml_file = self.create_test_yaml_file(duplicate_step_yaml)
-        try:
-            activity = guarded_ai.load_yaml_activity(yaml_file)
-
-            # Should load, but we can detect duplicates
-            step_ids = [step["step_id"] for step in activity["sections"][0]["steps"]]
-            unique_step_ids = set(step_ids)
+        yaml_stream = io.StringIO(duplicate_step_yaml)
+        activity = guarded_ai.load_yaml_activity(yaml_stream)
 
-            self.assertNotEqual(len(step_ids), len(unique_step_ids))  # Has duplicates
+        # Should load, but we can detect duplicates
+        step_ids = [step["step_id"] for step in activity["sections"][0]["steps"]]
+        unique_step_ids = set(step_ids)
 
-        finally:
-            os.unlink(yaml_file)
+        self.assertNotEqual(len(step_ids), len(unique_step_ids))  # Has duplicates
 
     def test_section_id_uniqueness(self):
         """Test that section IDs are unique"""
@@ -477,20 +423,14 @@ sections:
           - "Content 2"
 """
 
-        yaml_file = self.create_test_yaml_file(duplicate_section_yaml)
-        try:
-            activity = guarded_ai.load_yaml_activity(yaml_file)
-
-            # Should load, but we can detect duplicates
-            section_ids = [section["section_id"] for section in activity["sections"]]
-            unique_section_ids = set(section_ids)
+        yaml_stream = io.StringIO(duplicate_section_yaml)
+        activity = guarded_ai.load_yaml_activity(yaml_stream)
 
-            self.assertNotEqual(
-                len(section_ids), len(unique_section_ids)
-            )  # Has duplicates
+        # Should load, but we can detect duplicates
+        section_ids = [section["section_id"] for section in activity["sections"]]
+        unique_section_ids = set(section_ids)
 
-        finally:
-            os.unlink(yaml_file)
+        self.assertNotEqual(len(section_ids), len(unique_section_ids))  # Has duplicates
 
     def test_transition_references(self):
         """Test that transitions reference valid section:step combinations"""
@@ -510,30 +450,26 @@ sections:
             next_section_and_step: "nonexistent:step1"  # Invalid reference
 """
 
-        yaml_file = self.create_test_yaml_file(invalid_reference_yaml)
-        try:
-            activity = guarded_ai.load_yaml_activity(yaml_file)
+        yaml_stream = io.StringIO(invalid_reference_yaml)
+        activity = guarded_ai.load_yaml_activity(yaml_stream)
 
-            # YAML loads successfully but reference is invalid
-            step = activity["sections"][0]["steps"][0]
-            self.assertIn("transitions", step)
-            self.assertIn("yes", step["transitions"])
+        # YAML loads successfully but reference is invalid
+        step = activity["sections"][0]["steps"][0]
+        self.assertIn("transitions", step)
+        self.assertIn("yes", step["transitions"])
 
-            transition = step["transitions"]["yes"]
-            next_ref = transition["next_section_and_step"]
-            section_id, step_id = next_ref.split(":")
+        transition = step["transitions"]["yes"]
+        next_ref = transition["next_section_and_step"]
+        section_id, step_id = next_ref.split(":")
 
-            # Check if referenced section exists
-            referenced_section = None
-            for section in activity["sections"]:
-                if section["section_id"] == section_id:
-                    referenced_section = section
-                    break
+        # Check if referenced section exists
+        referenced_section = None
+        for section in activity["sections"]:
+            if section["section_id"] == section_id:
+                referenced_section = section
+                break
 
-            self.assertIsNone(referenced_section)  # Should not exist
-
-        finally:
-            os.unlink(yaml_file)
+        self.assertIsNone(referenced_section)  # Should not exist
 
     def test_bucket_transition_consistency(self):
         """Test that all buckets have corresponding transitions"""
@@ -560,23 +496,17 @@ sections:
           # Missing option_c transition!
 """
 
-        yaml_file = self.create_test_yaml_file(inconsistent_yaml)
-        try:
-            activity = guarded_ai.load_yaml_activity(yaml_file)
-
-            step = activity["sections"][0]["steps"][0]
-            buckets = set(step["buckets"])
-            transition_keys = set(step["transitions"].keys())
+        yaml_stream = io.StringIO(inconsistent_yaml)
+        activity = guarded_ai.load_yaml_activity(yaml_stream)
 
-            # Check for missing transitions
-            missing_transitions = buckets - transition_keys
-            self.assertTrue(
-                len(missing_transitions) > 0
-            )  # Should have missing transitions
-            self.assertIn("option_c", missing_transitions)
+        step = activity["sections"][0]["steps"][0]
+        buckets = set(step["buckets"])
+        transition_keys = set(step["transitions"].keys())
 
-        finally:
-            os.unlink(yaml_file)
+        # Check for missing transitions
+        missing_transitions = buckets - transition_keys
+        self.assertTrue(len(missing_transitions) > 0)  # Should have missing transitions
+        self.assertIn("option_c", missing_transitions)
 
 
 class TestRealYAMLFiles(unittest.TestCase):